@@ -0,0 +1,254 @@
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from flask import jsonify, request
+from database import READ_METHODS
+
+READS = 'reads'
+WRITES = 'writes'
+EXPORTS = 'exports'
+ROUTE_CLASSES = (READS, WRITES, EXPORTS)
+
+# Long-running endpoints that hold a connection for seconds at a time
+EXPORT_ENDPOINTS = {
+    'api.export_tenants', 'api.export_payments', 'api.rent_roll_report', 'api.arrears_report',
+    'api.create_invoices', 'api.reconcile_statement'
+}
+# POSTs that only read
+READ_ENDPOINTS = {'api.handle_batch'}
+# Never limited, so health checks and scrapes still answer under overload
+EXEMPT_ENDPOINTS = {'api.health_check', 'api.metrics_endpoint', 'api.cache_stats',
+                    'api.pool_statistics', 'api.admission_statistics'}
+
+# Clients with a token bucket; the least recently seen are forgotten first
+MAX_TRACKED_CLIENTS = 10000
+
+# Set on the WSGI environ, so a batch sub-request cannot release its parent's slot
+_SLOT = 'admission.slot'
+
+
+def route_class(endpoint, method):
+    if endpoint in EXPORT_ENDPOINTS:
+        return EXPORTS
+    if method in READ_METHODS or endpoint in READ_ENDPOINTS:
+        return READS
+    return WRITES
+
+def default_limits(pool_size, max_overflow):
+    """Split the connections a worker may open between the route classes.
+
+    The limits add up to pool size + overflow, so admitted requests never
+    wait for a connection, and exports and writes cannot take them all.
+    """
+    total = max(3, pool_size + max_overflow)
+    exports = max(1, total // 6)
+    writes = max(1, total // 3)
+    return {READS: total - writes - exports, WRITES: writes, EXPORTS: exports}
+
+class TokenBuckets:
+    """A token bucket per client: `rate` requests a second, bursts up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client):
+        """Take a token; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clients(self):
+        return len(self._buckets)
+
+class ConcurrencyLimit:
+    """At most `limit` requests in flight; up to `max_queue` more wait for a slot."""
+
+    def __init__(self, limit, max_queue):
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout):
+        """Returns the seconds spent queued, or None if the request is shed."""
+        with self._condition:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return 0.0
+            if self.waiting >= self.max_queue:
+                return None
+            self.waiting += 1
+            start = time.monotonic()
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        return None
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+                return time.monotonic() - start
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+class Admission:
+    """Sheds load before it reaches the connection pool.
+
+    Each client is rate limited with a token bucket (429 when empty), and
+    each route class has a concurrency limit with a short bounded queue
+    (503 when the queue is full or the wait times out). Both answer with
+    Retry-After. State is per worker process; gunicorn.conf.py already
+    sizes workers so their pools fit the database.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.buckets = None
+        self.limits = {}
+        self.queue_timeout = 2.0
+        self.shed = defaultdict(int)
+        self.queued = defaultdict(int)
+        self.queue_seconds = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        defaults = default_limits(app.config.get('DB_POOL_SIZE', 5), app.config.get('DB_MAX_OVERFLOW', 10))
+        app.config.setdefault('ADMISSION_ENABLED', True)
+        app.config.setdefault('RATE_LIMIT_PER_SECOND', 0)
+        app.config.setdefault('RATE_LIMIT_BURST', 20)
+        app.config.setdefault('ADMISSION_MAX_QUEUE', 64)
+        app.config.setdefault('ADMISSION_QUEUE_TIMEOUT', 2)
+        for name in ROUTE_CLASSES:
+            # 0 means the default share of the pool
+            if not app.config.get(f'CONCURRENCY_{name.upper()}'):
+                app.config[f'CONCURRENCY_{name.upper()}'] = defaults[name]
+        self.enabled = app.config['ADMISSION_ENABLED']
+        rate = float(app.config['RATE_LIMIT_PER_SECOND'])
+        self.buckets = TokenBuckets(rate, float(app.config['RATE_LIMIT_BURST'])) if rate > 0 else None
+        self.queue_timeout = float(app.config['ADMISSION_QUEUE_TIMEOUT'])
+        self.limits = {
+            name: ConcurrencyLimit(int(app.config[f'CONCURRENCY_{name.upper()}']),
+                                   int(app.config['ADMISSION_MAX_QUEUE']))
+            for name in ROUTE_CLASSES
+        }
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions['admission'] = self
+
+    def _count(self, counter, key):
+        with self._lock:
+            counter[key] += 1
+
+    def _before_request(self):
+        if (not self.enabled or request.method == 'OPTIONS'
+                or request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS):
+            return None
+        name = route_class(request.endpoint, request.method)
+        if self.buckets:
+            # Behind proxies, ProxyFix (TRUSTED_PROXIES) has already replaced
+            # the remote address with the one the nearest trusted proxy saw
+            wait = self.buckets.take(request.remote_addr)
+            if wait:
+                self._count(self.shed, (name, 'rate_limit'))
+                return _rejected(429, 'Too Many Requests', 'Rate limit exceeded', wait)
+        limit = self.limits[name]
+        waited = limit.acquire(self.queue_timeout)
+        if waited is None:
+            self._count(self.shed, (name, 'concurrency'))
+            return _rejected(503, 'Service Unavailable', f'Too many {name} in progress', self.queue_timeout)
+        if waited:
+            with self._lock:
+                self.queued[name] += 1
+                self.queue_seconds[name] += waited
+        request.environ[_SLOT] = limit
+        return None
+
+    def _after_request(self, response):
+        # A streamed export keeps its slot until the last chunk has been sent
+        if response.is_streamed:
+            limit = request.environ.pop(_SLOT, None)
+            if limit is not None:
+                response.call_on_close(limit.release)
+        return response
+
+    def _teardown_request(self, exception=None):
+        limit = request.environ.pop(_SLOT, None)
+        if limit is not None:
+            limit.release()
+
+    def snapshot(self):
+        with self._lock:
+            shed = dict(self.shed)
+            queued = dict(self.queued)
+            queue_seconds = dict(self.queue_seconds)
+        return {
+            'enabled': self.enabled,
+            'rate_limit': {
+                'per_second': self.buckets.rate if self.buckets else 0,
+                'burst': self.buckets.burst if self.buckets else 0,
+                'clients': self.buckets.clients() if self.buckets else 0
+            },
+            'routes': {
+                name: {
+                    'limit': limit.limit,
+                    'in_flight': limit.in_flight,
+                    'queue_depth': limit.waiting,
+                    'queued': queued.get(name, 0),
+                    'queue_seconds_total': round(queue_seconds.get(name, 0.0), 6),
+                    'shed_rate_limit': shed.get((name, 'rate_limit'), 0),
+                    'shed_concurrency': shed.get((name, 'concurrency'), 0)
+                }
+                for name, limit in self.limits.items()
+            }
+        }
+
+    def metric_samples(self):
+        routes = self.snapshot()['routes']
+
+        def per_class(key):
+            return [(f'route_class="{name}"', stats[key]) for name, stats in routes.items()]
+        return [
+            ('admission_shed_total', 'counter', 'Requests rejected before reaching the database',
+             [(f'route_class="{name}",reason="{reason}"', stats[f'shed_{reason}'])
+              for name, stats in routes.items() for reason in ('rate_limit', 'concurrency')]),
+            ('admission_in_flight', 'gauge', 'Requests holding a concurrency slot', per_class('in_flight')),
+            ('admission_queue_depth', 'gauge', 'Requests waiting for a concurrency slot',
+             per_class('queue_depth')),
+            ('admission_queued_total', 'counter', 'Requests that waited for a slot', per_class('queued')),
+            ('admission_queue_seconds_total', 'counter', 'Time spent waiting for a slot',
+             per_class('queue_seconds_total')),
+        ]
+
+admission = Admission()
+
+
+def _rejected(status, error, message, retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = jsonify({
+        'success': False,
+        'error': error,
+        'message': f'{message}; retry after {seconds}s'
+    })
+    response.status_code = status
+    response.headers['Retry-After'] = str(seconds)
+    return response
@@ -0,0 +1,254 @@
+from collections import defaultdict
+from datetime import date
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Tenant, PaymentHistory, MonthlyPropertySummary, TenantBalance
+
+# Summaries and tenant balances are kept in step with the payments table by
+# applying deltas in the same transaction as every payment write, so reports
+# and balance lookups never have to scan payments. rebuild_summaries() and
+# rebuild_balances() regenerate them from scratch.
+
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+TOTAL_COLUMNS = ('paid_amount', 'pending_amount', 'payment_count')
+
+# Float sums that differ by less than this are the same balance
+BALANCE_TOLERANCE = 0.005
+
+
+def month_of(value):
+    return date(value.year, value.month, 1)
+
+def payment_row(payment, property_id):
+    return (property_id, payment.tenant_id, payment.payment_date, payment.status, payment.amount)
+
+def _deltas():
+    return defaultdict(lambda: [0.0, 0.0, 0])
+
+def _add_to(delta, status, amount, count):
+    status = (status or '').lower()
+    if status == 'paid':
+        delta[0] += amount
+    elif status == 'pending':
+        delta[1] += amount
+    delta[2] += count
+
+def _add(deltas, property_id, payment_date, status, amount, count):
+    _add_to(deltas[(property_id, month_of(payment_date))], status, amount, count)
+
+def _tenant_totals(tenant_id):
+    # Archived payments are part of the summaries too
+    payment = PaymentHistory
+    return db.session.execute(
+        select(payment.payment_date, payment.status, func.sum(payment.amount), func.count(payment.id))
+        .where(payment.tenant_id == tenant_id)
+        .group_by(payment.payment_date, payment.status)
+    )
+
+def _upsert_totals(model, key_columns, rows):
+    if not rows:
+        return
+    insert = UPSERT_DIALECTS[db.session.get_bind().dialect.name]
+    table = model.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[name] for name in key_columns],
+        set_={name: table.c[name] + stmt.excluded[name] for name in TOTAL_COLUMNS}
+    )
+    db.session.execute(stmt, rows)
+
+def _upsert(deltas):
+    _upsert_totals(MonthlyPropertySummary, ('property_id', 'month'), [
+        {
+            'property_id': property_id,
+            'month': month,
+            'paid_amount': paid,
+            'pending_amount': pending,
+            'payment_count': count
+        }
+        for (property_id, month), (paid, pending, count) in deltas.items()
+        if paid or pending or count
+    ])
+
+def _upsert_balances(balances):
+    _upsert_totals(TenantBalance, ('tenant_id',), [
+        {
+            'tenant_id': tenant_id,
+            'paid_amount': paid,
+            'pending_amount': pending,
+            'payment_count': count
+        }
+        for tenant_id, (paid, pending, count) in balances.items()
+        if paid or pending or count
+    ])
+
+def record_payments(added=(), removed=()):
+    """Apply (property_id, tenant_id, payment_date, status, amount) rows to the
+    summaries and tenant balances.
+
+    Must be called before the commit of the write it describes.
+    """
+    record_payment_totals(
+        [row + (1,) for row in added]
+        + [(pid, tid, day, status, -amount, -1) for pid, tid, day, status, amount in removed]
+    )
+
+def record_payment_totals(totals):
+    # Pre-aggregated (property_id, tenant_id, payment_date, status, amount, count) rows
+    deltas, balances = _deltas(), _deltas()
+    for property_id, tenant_id, payment_date, status, amount, count in totals:
+        _add(deltas, property_id, payment_date, status, amount, count)
+        _add_to(balances[tenant_id], status, amount, count)
+    _upsert(deltas)
+    _upsert_balances(balances)
+
+def record_inserted_payments(rows):
+    # Rows from the bulk path carry tenant_id only
+    tenant_ids = {row['tenant_id'] for row in rows}
+    properties = dict(db.session.execute(
+        select(Tenant.id, Tenant.property_id).where(Tenant.id.in_(tenant_ids))
+    ).all())
+    record_payments(added=[
+        (properties[row['tenant_id']], row['tenant_id'], row['payment_date'], row['status'],
+         row['amount'])
+        for row in rows
+    ])
+
+def move_tenant_payments(tenant_id, old_property_id, new_property_id):
+    # Called when a tenant changes property (new_property_id) or is about to
+    # be deleted together with its payments (new_property_id=None). The
+    # tenant's balance is unaffected; its row goes with the tenant.
+    deltas = _deltas()
+    for payment_date, status, amount, count in _tenant_totals(tenant_id):
+        _add(deltas, old_property_id, payment_date, status, -amount, -count)
+        if new_property_id is not None:
+            _add(deltas, new_property_id, payment_date, status, amount, count)
+    _upsert(deltas)
+
+def forget_property(property_id):
+    MonthlyPropertySummary.query.filter_by(property_id=property_id).delete()
+
+def rebuild_summaries():
+    deltas = _deltas()
+    payment = PaymentHistory
+    totals = db.session.execute(
+        select(Tenant.property_id, payment.payment_date, payment.status,
+               func.sum(payment.amount), func.count(payment.id))
+        .join(Tenant, Tenant.id == payment.tenant_id)
+        .group_by(Tenant.property_id, payment.payment_date, payment.status)
+        .execution_options(include_archived=True)
+    )
+    for property_id, payment_date, status, amount, count in totals:
+        _add(deltas, property_id, payment_date, status, amount, count)
+    MonthlyPropertySummary.query.delete()
+    _upsert(deltas)
+    db.session.commit()
+    return len(deltas)
+
+@click.command('rebuild-summaries')
+@with_appcontext
+def rebuild_summaries_command():
+    """Regenerate monthly_property_summary from the payments tables."""
+    rows = rebuild_summaries()
+    click.echo(f'Rebuilt {rows} monthly property summaries')
+
+def tenant_balance(tenant_id):
+    """The tenant's totals from tenant_balances, or None if there is no such
+    tenant. A tenant without payments has no row and a zero balance."""
+    row = db.session.execute(
+        select(Tenant.id, TenantBalance.paid_amount, TenantBalance.pending_amount,
+               TenantBalance.payment_count)
+        .outerjoin(TenantBalance, TenantBalance.tenant_id == Tenant.id)
+        .where(Tenant.id == tenant_id)
+    ).first()
+    if row is None:
+        return None
+    paid, pending, count = row[1] or 0.0, row[2] or 0.0, row[3] or 0
+    return {
+        'tenant_id': row[0],
+        'paid_amount': round(paid, 2),
+        'pending_amount': round(pending, 2),
+        'payment_count': count,
+        # Pending payments are what the tenant still owes
+        'balance': round(pending, 2)
+    }
+
+def _computed_balances():
+    payment = PaymentHistory
+    status = func.lower(payment.status)
+    totals = db.session.execute(
+        select(payment.tenant_id,
+               func.sum(case((status == 'paid', payment.amount), else_=0)),
+               func.sum(case((status == 'pending', payment.amount), else_=0)),
+               func.count(payment.id))
+        .group_by(payment.tenant_id)
+        .execution_options(include_archived=True)
+    )
+    return {tenant_id: (paid, pending, count) for tenant_id, paid, pending, count in totals}
+
+def _differs(stored, expected):
+    return (
+        abs(stored[0] - expected[0]) > BALANCE_TOLERANCE
+        or abs(stored[1] - expected[1]) > BALANCE_TOLERANCE
+        or stored[2] != expected[2]
+    )
+
+def verify_balances():
+    """(tenant_id, stored, expected) for every balance that has drifted
+    from a recount of the payments tables."""
+    expected = _computed_balances()
+    stored = {
+        row.tenant_id: (row.paid_amount, row.pending_amount, row.payment_count)
+        for row in db.session.execute(select(TenantBalance)).scalars()
+    }
+    empty = (0.0, 0.0, 0)
+    drift = []
+    for tenant_id in sorted(expected.keys() | stored.keys()):
+        have, want = stored.get(tenant_id, empty), expected.get(tenant_id, empty)
+        if _differs(have, want):
+            drift.append((tenant_id, have, want))
+    return drift
+
+def rebuild_balances():
+    balances = _computed_balances()
+    TenantBalance.query.delete()
+    if balances:
+        db.session.execute(insert(TenantBalance), [
+            {
+                'tenant_id': tenant_id,
+                'paid_amount': paid,
+                'pending_amount': pending,
+                'payment_count': count
+            }
+            for tenant_id, (paid, pending, count) in balances.items()
+        ])
+    db.session.commit()
+    return len(balances)
+
+@click.command('verify-balances')
+@click.option('--fix', is_flag=True, help='Rebuild tenant_balances when drift is found.')
+@with_appcontext
+def verify_balances_command(fix):
+    """Recount tenant balances from the payments tables and report drift."""
+    drift = verify_balances()
+    for tenant_id, stored, expected in drift:
+        click.echo(
+            f'tenant {tenant_id}: stored paid={stored[0]:.2f} pending={stored[1]:.2f} '
+            f'count={stored[2]}, expected paid={expected[0]:.2f} pending={expected[1]:.2f} '
+            f'count={expected[2]}'
+        )
+    if not drift:
+        click.echo('Tenant balances match the payments tables')
+        return
+    click.echo(f'{len(drift)} tenant balances drifted')
+    if fix:
+        rows = rebuild_balances()
+        click.echo(f'Rebuilt {rows} tenant balances')
+    else:
+        raise SystemExit(1)
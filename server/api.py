@@ -0,0 +1,778 @@
+from flask import Blueprint, abort, current_app, jsonify, request
+from datetime import datetime
+from models import db, Property, Tenant, Payment, PaymentHistory
+from pagination import keyset_order, keyset_paginate
+from bulk import iter_records, ingest_payments, ingest_tenants
+from aggregates import (forget_property, move_tenant_payments, payment_row, record_payments,
+                        tenant_balance)
+from reports import arrears, rent_roll
+from filters import (PAYMENT_SORTS, TENANT_FILTERS, TENANT_SORTS, apply_filters,
+                     parse_sort, payment_filters, search_tenants)
+from invoices import generate_invoices
+from batch import fetch_by_ids, parse_ids, run_batch
+from includes import Includes
+from schemas import BATCH_SCHEMA, INVOICE_SCHEMA, PAYMENT_SCHEMA, PROPERTY_SCHEMA, TENANT_SCHEMA
+from reconcile import DEFAULT_UNMATCHED_LIMIT, DEFAULT_WINDOW_DAYS, reconcile, statement_lines
+from changes import DEFAULT_LIMIT, changes_since, head, record_property_delete, record_tenant_delete
+from soft_delete import archive_property, archive_tenant
+from payment_archive import payment_model
+from cache import cache, cached
+from serializers import LIST_FORMATS
+from metrics import metrics
+from database import committed_writes, pool_stats
+from admission import admission
+from export import EXPORT_FORMATS, export_response, payments_export_query, tenants_export_query
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import undefer_group
+from werkzeug.exceptions import HTTPException
+
+# Every route of the API; registered on the app by create_app()
+api = Blueprint('api', __name__)
+
+# Error handlers
+@api.app_errorhandler(HTTPException)
+def handle_http_error(e):
+    return jsonify({
+        'success': False,
+        'error': e.name,
+        'message': e.description
+    }), e.code
+
+@api.app_errorhandler(SQLAlchemyError)
+def handle_db_error(e):
+    db.session.rollback()
+    return jsonify({
+        'success': False,
+        'error': 'Database error',
+        'message': str(e)
+    }), 500
+
+@api.app_errorhandler(Exception)
+def handle_unexpected_error(e):
+    return jsonify({
+        'success': False,
+        'error': 'Unexpected error',
+        'message': str(e)
+    }), 500
+
+# Helper functions
+def get_json_body(schema, partial=False):
+    if not request.is_json:
+        raise ValueError('Content-Type must be application/json')
+    return schema.load(request.get_json(), partial)
+
+def get_pagination_params():
+    page = request.args.get('page', 1, type=int)
+    per_page = get_page_size('per_page')
+    return page, per_page
+
+def get_page_size(name, default=10):
+    size = request.args.get(name, default, type=int)
+    if not 1 <= size <= current_app.config['MAX_PER_PAGE']:
+        raise ValueError(f'{name} must be between 1 and {current_app.config["MAX_PER_PAGE"]}')
+    return size
+
+def get_list_format():
+    # ?format=columnar sends the keys once instead of on every row
+    fmt = request.args.get('format', 'json')
+    if fmt not in LIST_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(LIST_FORMATS)}')
+    return fmt
+
+def get_chunk_size():
+    chunk_size = request.args.get('chunk_size', current_app.config['BULK_CHUNK_SIZE'], type=int)
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be a positive integer')
+    return chunk_size
+
+def get_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Invalid {name}. Use YYYY-MM-DD')
+
+def get_month_arg():
+    value = request.args.get('month')
+    if not value:
+        return datetime.utcnow().date().replace(day=1)
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise ValueError('Invalid month. Use YYYY-MM')
+
+def get_export_format():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(EXPORT_FORMATS)}')
+    return fmt
+
+def invalidate_property(property_id):
+    # Tenant rows show the property name, reports show its rent
+    cache.invalidate('properties', f'properties:{property_id}', 'tenants', 'reports')
+
+def invalidate_tenant(tenant_id, *property_ids):
+    # Properties show tenant_count, payment rows show the tenant name
+    cache.invalidate('tenants', f'tenants:{tenant_id}', 'properties', 'payments', 'reports',
+                     *(f'properties:{pid}' for pid in property_ids))
+
+def invalidate_payment(payment_id, *tenant_ids):
+    # Tenants show payment_count
+    cache.invalidate('payments', f'payments:{payment_id}', 'tenants', 'reports',
+                     *(f'tenants:{tid}' for tid in tenant_ids))
+
+def check_email_free(email, tenant_id=None):
+    # Archived tenants keep their email under the unique constraint
+    stmt = select(Tenant.id).where(Tenant.email == email).execution_options(include_archived=True)
+    if tenant_id is not None:
+        stmt = stmt.where(Tenant.id != tenant_id)
+    if db.session.scalar(stmt.limit(1)) is not None:
+        raise ValueError('Email already in use')
+
+def commit_tenant(email, tenant_id=None):
+    # Another request can take the email between the check and the commit
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        check_email_free(email, tenant_id)
+        raise
+
+def with_summary(model):
+    # Loads counts and joined names in the same query as the rows
+    return model.query.options(undefer_group('summary'))
+
+def get_includes(model):
+    # ?include= is only honoured on GET; writes return the bare row
+    if request.method != 'GET':
+        return Includes(model)
+    return Includes.parse(model, request.args)
+
+def list_response(model, keyset, query=None, sorts=()):
+    # ?fields= limits both the columns loaded and the keys emitted
+    serializer = model.serializer
+    fields = serializer.parse_fields(request.args.get('fields'))
+    columnar = get_list_format() == 'columnar'
+
+    def rows_body(items):
+        if columnar:
+            return {'columns': serializer.columns_for(fields), 'rows': serializer.rows(items, fields)}
+        return {'data': [serializer(item, fields) for item in items]}
+
+    query = model.query if query is None else query
+    sort = request.args.get('sort')
+    keyset, descending = parse_sort(model, sort, sorts, keyset) if sorts else (keyset, False)
+    rows = query.options(*serializer.load_options(fields, always=keyset))
+
+    # ?ids=1,2,3 returns exactly those rows, in that order
+    if request.args.get('ids'):
+        ids = parse_ids(request.args['ids'])
+        found = fetch_by_ids(model, ids, serializer.load_options(fields, always=keyset))
+        return jsonify({
+            'success': True,
+            **rows_body([found[id] for id in ids if id in found]),
+            'missing': [id for id in ids if id not in found]
+        })
+
+    # ?cursor= / ?limit= switches to keyset pagination, which avoids the
+    # OFFSET scan and only counts the table when ?with_total=1 is given
+    if 'cursor' in request.args or 'limit' in request.args:
+        limit = get_page_size('limit')
+        items, next_cursor = keyset_paginate(rows, keyset, limit, request.args.get('cursor'),
+                                             descending)
+        body = {
+            'success': True,
+            **rows_body(items),
+            'next_cursor': next_cursor,
+            'limit': limit
+        }
+        if request.args.get('with_total', 0, type=int):
+            body['total'] = query.order_by(None).count()
+        return jsonify(body)
+
+    page, per_page = get_pagination_params()
+    if sort:
+        rows = rows.order_by(*keyset_order(keyset, descending))
+    result = rows.paginate(page=page, per_page=per_page)
+    return jsonify({
+        'success': True,
+        **rows_body(result.items),
+        'total': result.total,
+        'pages': result.pages,
+        'current_page': result.page
+    })
+
+# Property CRUD Operations
+@api.route('/api/properties', methods=['GET', 'POST'])
+@cached('properties')
+def handle_properties():
+    if request.method == 'GET':
+        try:
+            return list_response(Property, (Property.id,))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+    
+    elif request.method == 'POST':
+        try:
+            data = get_json_body(PROPERTY_SCHEMA)
+            
+            new_property = Property(
+                name=data['name'],
+                address=data['address'],
+                bedrooms=data['bedrooms'],
+                rent=data['rent']
+            )
+            db.session.add(new_property)
+            db.session.commit()
+            invalidate_property(new_property.id)
+            
+            return jsonify({
+                'success': True,
+                'data': new_property.to_dict()
+            }), 201
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+
+@api.route('/api/properties/<int:id>', methods=['GET', 'PUT', 'DELETE'])
+@cached('properties')
+def handle_property(id):
+    try:
+        includes = get_includes(Property)
+        # The body is checked before the row is loaded
+        data = get_json_body(PROPERTY_SCHEMA, partial=True) if request.method == 'PUT' else None
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    property = with_summary(Property).options(*includes.options()).get_or_404(id)
+    
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'data': includes.serialize(property)
+        })
+    
+    elif request.method == 'PUT':
+        property.name = data.get('name', property.name)
+        property.address = data.get('address', property.address)
+        property.bedrooms = data.get('bedrooms', property.bedrooms)
+        property.rent = data.get('rent', property.rent)
+        
+        db.session.commit()
+        invalidate_property(property.id)
+        return jsonify({
+            'success': True,
+            'data': property.to_dict()
+        })
+    
+    elif request.method == 'DELETE':
+        if current_app.config['DELETE_MODE'] == 'archive':
+            archive_property(property)
+        else:
+            # One DELETE; tenants, payments and summaries go by ON DELETE CASCADE
+            forget_property(property.id)
+            record_property_delete(property.id)
+            db.session.delete(property)
+        db.session.commit()
+        # Tenants and payments went with it
+        cache.clear()
+        return jsonify({
+            'success': True,
+            'message': 'Property deleted successfully'
+        })
+
+# Tenant CRUD Operations
+@api.route('/api/tenants', methods=['GET', 'POST'])
+@cached('tenants')
+def handle_tenants():
+    if request.method == 'GET':
+        try:
+            query = apply_filters(Tenant.query, TENANT_FILTERS, request.args)
+            if request.args.get('q'):
+                query = search_tenants(query, request.args['q'])
+            return list_response(Tenant, (Tenant.id,), query, TENANT_SORTS)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+    
+    elif request.method == 'POST':
+        try:
+            data = get_json_body(TENANT_SCHEMA)
+            
+            # Verify property exists
+            if not Property.query.get(data['property_id']):
+                raise ValueError('Property does not exist')
+            check_email_free(data['email'])
+            
+            new_tenant = Tenant(
+                name=data['name'],
+                phone=data['phone'],
+                email=data['email'],
+                unit_id=data['unit_id'],
+                property_id=data['property_id']
+            )
+            db.session.add(new_tenant)
+            commit_tenant(new_tenant.email)
+            invalidate_tenant(new_tenant.id, new_tenant.property_id)
+            
+            return jsonify({
+                'success': True,
+                'data': new_tenant.to_dict()
+            }), 201
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+
+@api.route('/api/tenants/export')
+def export_tenants():
+    try:
+        fmt = get_export_format()
+        stmt = tenants_export_query(get_date_arg('start_date'), get_date_arg('end_date'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    return export_response(stmt, fmt, 'tenants')
+
+@api.route('/api/tenants/bulk', methods=['POST'])
+def bulk_create_tenants():
+    try:
+        result = ingest_tenants(iter_records(request), get_chunk_size())
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    finally:
+        cache.clear()
+    return jsonify({'success': True, **result})
+
+@api.route('/api/tenants/<int:id>', methods=['GET', 'PUT', 'DELETE'])
+@cached('tenants')
+def handle_tenant(id):
+    try:
+        includes = get_includes(Tenant)
+        data = get_json_body(TENANT_SCHEMA, partial=True) if request.method == 'PUT' else None
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    tenant = with_summary(Tenant).options(*includes.options()).get_or_404(id)
+    
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'data': includes.serialize(tenant)
+        })
+    
+    elif request.method == 'PUT':
+        try:
+            if 'property_id' in data and not Property.query.get(data['property_id']):
+                raise ValueError('Property does not exist')
+            if 'email' in data:
+                check_email_free(data['email'], tenant.id)
+            
+            tenant.name = data.get('name', tenant.name)
+            tenant.phone = data.get('phone', tenant.phone)
+            tenant.email = data.get('email', tenant.email)
+            tenant.unit_id = data.get('unit_id', tenant.unit_id)
+            old_property_id = tenant.property_id
+            if data.get('property_id', tenant.property_id) != tenant.property_id:
+                move_tenant_payments(tenant.id, tenant.property_id, data['property_id'])
+                tenant.property_id = data['property_id']
+            
+            commit_tenant(tenant.email, tenant.id)
+            invalidate_tenant(tenant.id, old_property_id, tenant.property_id)
+            return jsonify({
+                'success': True,
+                'data': tenant.to_dict()
+            })
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+    
+    elif request.method == 'DELETE':
+        if current_app.config['DELETE_MODE'] == 'archive':
+            archive_tenant(tenant)
+        else:
+            move_tenant_payments(tenant.id, tenant.property_id, None)
+            record_tenant_delete(tenant.id)
+            db.session.delete(tenant)
+        db.session.commit()
+        # Its payments went with it
+        invalidate_tenant(tenant.id, tenant.property_id)
+        cache.invalidate('payments')
+        return jsonify({
+            'success': True,
+            'message': 'Tenant deleted successfully'
+        })
+
+@api.route('/api/tenants/<int:id>/balance')
+@cached('tenants')
+def get_tenant_balance(id):
+    balance = tenant_balance(id)
+    if balance is None:
+        abort(404)
+    return jsonify({
+        'success': True,
+        'data': balance
+    })
+
+# Payment CRUD Operations
+@api.route('/api/payments', methods=['GET', 'POST'])
+@cached('payments')
+def handle_payments():
+    if request.method == 'GET':
+        try:
+            # Only a date range reaching back past the hot table reads the archive too
+            model = payment_model(get_date_arg('start_date'), get_date_arg('end_date'))
+            query = apply_filters(model.query, payment_filters(model), request.args)
+            return list_response(model, (model.payment_date, model.id), query, PAYMENT_SORTS)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+    
+    elif request.method == 'POST':
+        try:
+            data = get_json_body(PAYMENT_SCHEMA)
+            
+            # Verify tenant exists
+            tenant = Tenant.query.get(data['tenant_id'])
+            if not tenant:
+                raise ValueError('Tenant does not exist')
+            
+            new_payment = Payment(
+                payment_type=data['payment_type'],
+                amount=data['amount'],
+                payment_date=data['payment_date'],
+                tenant_id=data['tenant_id'],
+                status=data['status']
+            )
+            db.session.add(new_payment)
+            record_payments(added=[payment_row(new_payment, tenant.property_id)])
+            db.session.commit()
+            invalidate_payment(new_payment.id, new_payment.tenant_id)
+            
+            return jsonify({
+                'success': True,
+                'data': new_payment.to_dict()
+            }), 201
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+
+@api.route('/api/payments/export')
+def export_payments():
+    try:
+        fmt = get_export_format()
+        stmt = payments_export_query(
+            get_date_arg('start_date'),
+            get_date_arg('end_date'),
+            request.args.get('status')
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    return export_response(stmt, fmt, 'payments')
+
+@api.route('/api/payments/bulk', methods=['POST'])
+def bulk_create_payments():
+    try:
+        result = ingest_payments(iter_records(request), get_chunk_size())
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    finally:
+        cache.clear()
+    return jsonify({'success': True, **result})
+
+@api.route('/api/payments/<int:id>', methods=['GET', 'PUT', 'DELETE'])
+@cached('payments')
+def handle_payment(id):
+    try:
+        includes = get_includes(Payment)
+        data = get_json_body(PAYMENT_SCHEMA, partial=True) if request.method == 'PUT' else None
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    payment = with_summary(Payment).options(*includes.options()).get(id)
+    if payment is None:
+        if request.method != 'GET':
+            abort(404)
+        # Archived payments stay readable, without includes; writes are 404
+        archived = with_summary(PaymentHistory).get_or_404(id)
+        return jsonify({
+            'success': True,
+            'data': archived.to_dict()
+        })
+    
+    if request.method == 'GET':
+        return jsonify({
+            'success': True,
+            'data': includes.serialize(payment)
+        })
+    
+    elif request.method == 'PUT':
+        try:
+            tenant = payment.tenant
+            if 'tenant_id' in data:
+                tenant = Tenant.query.get(data['tenant_id'])
+                if not tenant:
+                    raise ValueError('Tenant does not exist')
+            old_row = payment_row(payment, payment.tenant.property_id)
+            old_tenant_id = payment.tenant_id
+            
+            payment.payment_date = data.get('payment_date', payment.payment_date)
+            payment.payment_type = data.get('payment_type', payment.payment_type)
+            payment.amount = data.get('amount', payment.amount)
+            payment.status = data.get('status', payment.status)
+            payment.tenant_id = data.get('tenant_id', payment.tenant_id)
+            
+            record_payments(added=[payment_row(payment, tenant.property_id)], removed=[old_row])
+            db.session.commit()
+            invalidate_payment(payment.id, old_tenant_id, payment.tenant_id)
+            return jsonify({
+                'success': True,
+                'data': payment.to_dict()
+            })
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': str(e)
+            }), 400
+    
+    elif request.method == 'DELETE':
+        record_payments(removed=[payment_row(payment, payment.tenant.property_id)])
+        db.session.delete(payment)
+        db.session.commit()
+        invalidate_payment(payment.id, payment.tenant_id)
+        return jsonify({
+            'success': True,
+            'message': 'Payment deleted successfully'
+        })
+
+# Reports
+@api.route('/api/reports/rent-roll')
+@cached('reports')
+def rent_roll_report():
+    try:
+        month = get_month_arg()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'success': True,
+        'data': rent_roll(month)
+    })
+
+@api.route('/api/reports/arrears')
+@cached('reports')
+def arrears_report():
+    try:
+        month = get_month_arg()
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    return jsonify({
+        'success': True,
+        'data': arrears(month)
+    })
+
+# Admin jobs
+@api.route('/api/admin/invoices', methods=['POST'])
+def create_invoices():
+    try:
+        data = get_json_body(INVOICE_SCHEMA)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    
+    result = generate_invoices(data['month'], workers=data['workers'])
+    if result['invoices_created']:
+        # Committed on worker threads, outside this request's session
+        committed_writes()
+    cache.clear()
+    return jsonify({
+        'success': True,
+        'data': result
+    }), 201
+
+@api.route('/api/reconcile', methods=['POST'])
+def reconcile_statement():
+    # The CSV body is read as a stream, so statements of any size fit in memory
+    try:
+        if request.mimetype != 'text/csv':
+            raise ValueError('Content-Type must be text/csv')
+        window = request.args.get('window', DEFAULT_WINDOW_DAYS, type=int)
+        if window < 0:
+            raise ValueError('window must not be negative')
+        unmatched_limit = request.args.get('unmatched_limit', DEFAULT_UNMATCHED_LIMIT, type=int)
+        if not 0 <= unmatched_limit <= current_app.config['MAX_PER_PAGE']:
+            raise ValueError(f'unmatched_limit must be between 0 and {current_app.config["MAX_PER_PAGE"]}')
+        totals, unmatched = reconcile(statement_lines(request.stream), window,
+                                      get_chunk_size(), unmatched_limit)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    finally:
+        cache.clear()
+    return jsonify({
+        'success': True,
+        'data': totals,
+        'unmatched': unmatched
+    })
+
+# Batch reads
+@api.route('/api/batch', methods=['POST'])
+def handle_batch():
+    try:
+        data = get_json_body(BATCH_SCHEMA)
+        results = run_batch(data['requests'])
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'data': results
+    })
+
+# Change feed
+@api.route('/api/changes')
+def get_changes():
+    # Without ?since= only the current cursor is returned: take it before
+    # loading the lists, then poll with it
+    since = request.args.get('since', type=int)
+    if since is None:
+        if 'since' in request.args:
+            return jsonify({
+                'success': False,
+                'error': 'Validation error',
+                'message': 'since must be an integer cursor'
+            }), 400
+        return jsonify({
+            'success': True,
+            'data': [],
+            'next_cursor': head(),
+            'has_more': False
+        })
+    try:
+        limit = get_page_size('limit', DEFAULT_LIMIT)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Validation error',
+            'message': str(e)
+        }), 400
+    try:
+        changes, next_cursor, has_more = changes_since(
+            since, limit, current_app.config['CHANGES_SETTLE_SECONDS'])
+    except LookupError as e:
+        # The entries after the cursor were pruned; the client has to reload
+        return jsonify({
+            'success': False,
+            'error': 'Gone',
+            'message': str(e)
+        }), 410
+    return jsonify({
+        'success': True,
+        'data': changes,
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    })
+
+# Response cache statistics
+@api.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({
+        'success': True,
+        'data': cache.stats()
+    })
+
+# Connection pool statistics
+@api.route('/api/pool/stats')
+def pool_statistics():
+    return jsonify({
+        'success': True,
+        'data': pool_stats.snapshot()
+    })
+
+# Admission control: limits, queues and shed requests
+@api.route('/api/admission/stats')
+def admission_statistics():
+    return jsonify({
+        'success': True,
+        'data': admission.snapshot()
+    })
+
+# Prometheus metrics
+@api.route('/api/metrics')
+def metrics_endpoint():
+    return metrics.response()
+
+# Health Check
+@api.route('/api/health')
+def health_check():
+    return jsonify({
+        'success': True,
+        'message': 'API is healthy',
+        'status': 'running'
+    })
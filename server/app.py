@@ -1,350 +1,146 @@
-from flask import Flask, jsonify, request
-from flask_migrate import Migrate
-from flask_cors import CORS
-from datetime import datetime
-from models import db, Property, Tenant, Payment
-from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.exceptions import HTTPException
 import os
 from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Initialize Flask app
-app = Flask(__name__)
-
-# Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', '').replace(
-    'postgres://', 'postgresql://') + '?sslmode=require'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'fallback-secret-key')
-app.config['JSON_SORT_KEYS'] = False
-
-# Initialize extensions
-db.init_app(app)
-migrate = Migrate(app, db)
-
-# Enable CORS
-CORS(app)
-
-# Error handlers
-@app.errorhandler(HTTPException)
-def handle_http_error(e):
-    return jsonify({
-        'success': False,
-        'error': e.name,
-        'message': e.description
-    }), e.code
-
-@app.errorhandler(SQLAlchemyError)
-def handle_db_error(e):
-    db.session.rollback()
-    return jsonify({
-        'success': False,
-        'error': 'Database error',
-        'message': str(e)
-    }), 500
-
-@app.errorhandler(Exception)
-def handle_unexpected_error(e):
-    return jsonify({
-        'success': False,
-        'error': 'Unexpected error',
-        'message': str(e)
-    }), 500
-
-# Helper functions
-def validate_json():
-    if not request.is_json:
-        raise ValueError('Content-Type must be application/json')
-    return request.get_json()
-
-def validate_required_fields(data, required_fields):
-    missing = [field for field in required_fields if field not in data]
-    if missing:
-        raise ValueError(f'Missing required fields: {", ".join(missing)}')
-
-def get_pagination_params():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    return page, per_page
-
-# Property CRUD Operations
-@app.route('/api/properties', methods=['GET', 'POST'])
-def handle_properties():
-    if request.method == 'GET':
-        page, per_page = get_pagination_params()
-        properties = Property.query.paginate(page=page, per_page=per_page)
-        return jsonify({
-            'success': True,
-            'data': [p.to_dict() for p in properties.items],
-            'total': properties.total,
-            'pages': properties.pages,
-            'current_page': properties.page
-        })
-    
-    elif request.method == 'POST':
-        try:
-            data = validate_json()
-            validate_required_fields(data, ['name', 'address', 'bedrooms', 'rent'])
-            
-            new_property = Property(
-                name=data['name'],
-                address=data['address'],
-                bedrooms=data['bedrooms'],
-                rent=data['rent']
-            )
-            db.session.add(new_property)
-            db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'data': new_property.to_dict()
-            }), 201
-        except ValueError as e:
-            return jsonify({
-                'success': False,
-                'error': 'Validation error',
-                'message': str(e)
-            }), 400
-
-@app.route('/api/properties/<int:id>', methods=['GET', 'PUT', 'DELETE'])
-def handle_property(id):
-    property = Property.query.get_or_404(id)
-    
-    if request.method == 'GET':
-        return jsonify({
-            'success': True,
-            'data': property.to_dict()
-        })
-    
-    elif request.method == 'PUT':
-        try:
-            data = validate_json()
-            
-            property.name = data.get('name', property.name)
-            property.address = data.get('address', property.address)
-            property.bedrooms = data.get('bedrooms', property.bedrooms)
-            property.rent = data.get('rent', property.rent)
-            
-            db.session.commit()
-            return jsonify({
-                'success': True,
-                'data': property.to_dict()
-            })
-        except ValueError as e:
-            return jsonify({
-                'success': False,
-                'error': 'Validation error',
-                'message': str(e)
-            }), 400
-    
-    elif request.method == 'DELETE':
-        db.session.delete(property)
-        db.session.commit()
-        return jsonify({
-            'success': True,
-            'message': 'Property deleted successfully'
-        })
-
-# Tenant CRUD Operations
-@app.route('/api/tenants', methods=['GET', 'POST'])
-def handle_tenants():
-    if request.method == 'GET':
-        page, per_page = get_pagination_params()
-        tenants = Tenant.query.paginate(page=page, per_page=per_page)
-        return jsonify({
-            'success': True,
-            'data': [t.to_dict() for t in tenants.items],
-            'total': tenants.total,
-            'pages': tenants.pages,
-            'current_page': tenants.page
-        })
-    
-    elif request.method == 'POST':
-        try:
-            data = validate_json()
-            validate_required_fields(data, ['name', 'phone', 'email', 'unit_id', 'property_id'])
-            
-            # Verify property exists
-            if not Property.query.get(data['property_id']):
-                raise ValueError('Property does not exist')
-            
-            new_tenant = Tenant(
-                name=data['name'],
-                phone=data['phone'],
-                email=data['email'],
-                unit_id=data['unit_id'],
-                property_id=data['property_id']
-            )
-            db.session.add(new_tenant)
-            db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'data': new_tenant.to_dict()
-            }), 201
-        except ValueError as e:
-            return jsonify({
-                'success': False,
-                'error': 'Validation error',
-                'message': str(e)
-            }), 400
-
-@app.route('/api/tenants/<int:id>', methods=['GET', 'PUT', 'DELETE'])
-def handle_tenant(id):
-    tenant = Tenant.query.get_or_404(id)
-    
-    if request.method == 'GET':
-        return jsonify({
-            'success': True,
-            'data': tenant.to_dict()
-        })
-    
-    elif request.method == 'PUT':
-        try:
-            data = validate_json()
-            
-            if 'property_id' in data and not Property.query.get(data['property_id']):
-                raise ValueError('Property does not exist')
-            
-            tenant.name = data.get('name', tenant.name)
-            tenant.phone = data.get('phone', tenant.phone)
-            tenant.email = data.get('email', tenant.email)
-            tenant.unit_id = data.get('unit_id', tenant.unit_id)
-            tenant.property_id = data.get('property_id', tenant.property_id)
-            
-            db.session.commit()
-            return jsonify({
-                'success': True,
-                'data': tenant.to_dict()
-            })
-        except ValueError as e:
-            return jsonify({
-                'success': False,
-                'error': 'Validation error',
-                'message': str(e)
-            }), 400
-    
-    elif request.method == 'DELETE':
-        db.session.delete(tenant)
-        db.session.commit()
-        return jsonify({
-            'success': True,
-            'message': 'Tenant deleted successfully'
-        })
-
-# Payment CRUD Operations
-@app.route('/api/payments', methods=['GET', 'POST'])
-def handle_payments():
-    if request.method == 'GET':
-        page, per_page = get_pagination_params()
-        payments = Payment.query.paginate(page=page, per_page=per_page)
-        return jsonify({
-            'success': True,
-            'data': [p.to_dict() for p in payments.items],
-            'total': payments.total,
-            'pages': payments.pages,
-            'current_page': payments.page
-        })
-    
-    elif request.method == 'POST':
-        try:
-            data = validate_json()
-            validate_required_fields(data, ['payment_type', 'amount', 'payment_date', 'tenant_id'])
-            
-            # Verify tenant exists
-            if not Tenant.query.get(data['tenant_id']):
-                raise ValueError('Tenant does not exist')
-            
-            try:
-                payment_date = datetime.strptime(data['payment_date'], '%Y-%m-%d').date()
-            except ValueError:
-                raise ValueError('Invalid date format. Use YYYY-MM-DD')
-            
-            new_payment = Payment(
-                payment_type=data['payment_type'],
-                amount=data['amount'],
-                payment_date=payment_date,
-                tenant_id=data['tenant_id'],
-                status=data.get('status', 'pending')
-            )
-            db.session.add(new_payment)
-            db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'data': new_payment.to_dict()
-            }), 201
-        except ValueError as e:
-            return jsonify({
-                'success': False,
-                'error': 'Validation error',
-                'message': str(e)
-            }), 400
-
-@app.route('/api/payments/<int:id>', methods=['GET', 'PUT', 'DELETE'])
-def handle_payment(id):
-    payment = Payment.query.get_or_404(id)
-    
-    if request.method == 'GET':
-        return jsonify({
-            'success': True,
-            'data': payment.to_dict()
-        })
-    
-    elif request.method == 'PUT':
-        try:
-            data = validate_json()
-            
-            if 'tenant_id' in data and not Tenant.query.get(data['tenant_id']):
-                raise ValueError('Tenant does not exist')
-            
-            if 'payment_date' in data:
-                try:
-                    payment.payment_date = datetime.strptime(data['payment_date'], '%Y-%m-%d').date()
-                except ValueError:
-                    raise ValueError('Invalid date format. Use YYYY-MM-DD')
-            
-            payment.payment_type = data.get('payment_type', payment.payment_type)
-            payment.amount = data.get('amount', payment.amount)
-            payment.status = data.get('status', payment.status)
-            payment.tenant_id = data.get('tenant_id', payment.tenant_id)
-            
-            db.session.commit()
-            return jsonify({
-                'success': True,
-                'data': payment.to_dict()
-            })
-        except ValueError as e:
-            return jsonify({
-                'success': False,
-                'error': 'Validation error',
-                'message': str(e)
-            }), 400
-    
-    elif request.method == 'DELETE':
-        db.session.delete(payment)
-        db.session.commit()
-        return jsonify({
-            'success': True,
-            'message': 'Payment deleted successfully'
-        })
-
-# Health Check
-@app.route('/api/health')
-def health_check():
-    return jsonify({
-        'success': True,
-        'message': 'API is healthy',
-        'status': 'running'
-    })
-
-# Database teardown
-@app.teardown_appcontext
-def shutdown_session(exception=None):
-    db.session.remove()
+from flask import Flask
+from flask_cors import CORS
+from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
+from models import db
+from api import api
+from explain import check_indexes_command
+from aggregates import rebuild_summaries_command, verify_balances_command
+from seed import seed_command
+from invoices import generate_invoices_command
+from payment_archive import archive_payments_command
+from changes import prune_changes_command
+from reconcile import reconcile_command
+from soft_delete import DELETE_MODES
+from cache import cache
+from compression import compression
+from admission import admission
+from serializers import install_json_provider
+from metrics import metrics
+from database import (configure_engines, database_uri, dispose_engines_after_fork,
+                      init_read_your_writes, pool_stats)
+
+# Extensions are created unbound and attached to each app in create_app()
+migrate = Migrate()
+
+CLI_COMMANDS = (
+    check_indexes_command,
+    rebuild_summaries_command,
+    seed_command,
+    generate_invoices_command,
+    archive_payments_command,
+    verify_balances_command,
+    prune_changes_command,
+    reconcile_command
+)
+
+
+def load_config(app):
+    """Read the configuration from the environment (and server/.env)."""
+    load_dotenv()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'fallback-secret-key')
+    app.config['JSON_SORT_KEYS'] = False
+    app.config['BULK_CHUNK_SIZE'] = int(os.environ.get('BULK_CHUNK_SIZE', 1000))
+    app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', 5))
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    app.config['MAX_PER_PAGE'] = int(os.environ.get('MAX_PER_PAGE', 1000))
+    app.config['GZIP_ENABLED'] = os.environ.get('GZIP_ENABLED', '1') == '1'
+    app.config['GZIP_MIN_BYTES'] = int(os.environ.get('GZIP_MIN_BYTES', 1024))
+    app.config['GZIP_LEVEL'] = int(os.environ.get('GZIP_LEVEL', 6))
+
+    # Database pool and optional read replica
+    app.config['DATABASE_URL'] = os.environ.get('DATABASE_URL', '')
+    app.config['DATABASE_REPLICA_URL'] = os.environ.get('DATABASE_REPLICA_URL')
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 0))
+    app.config['SQL_STATEMENT_HEADER'] = os.environ.get('SQL_STATEMENT_HEADER') == '1'
+    app.config['REPLICA_READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
+
+    # Proxies in front of the app; each appends to X-Forwarded-For, and only
+    # the entries they added are trusted for the client address
+    app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Admission control: per-client rate limit (0 = off) and per-route-class
+    # concurrency limits (0 = a share of DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    app.config['ADMISSION_ENABLED'] = os.environ.get('ADMISSION_ENABLED', '1') == '1'
+    app.config['RATE_LIMIT_PER_SECOND'] = float(os.environ.get('RATE_LIMIT_PER_SECOND', 0))
+    app.config['RATE_LIMIT_BURST'] = float(os.environ.get('RATE_LIMIT_BURST', 20))
+    app.config['CONCURRENCY_READS'] = int(os.environ.get('CONCURRENCY_READS', 0))
+    app.config['CONCURRENCY_WRITES'] = int(os.environ.get('CONCURRENCY_WRITES', 0))
+    app.config['CONCURRENCY_EXPORTS'] = int(os.environ.get('CONCURRENCY_EXPORTS', 0))
+    app.config['ADMISSION_MAX_QUEUE'] = int(os.environ.get('ADMISSION_MAX_QUEUE', 64))
+    app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2))
+
+    # Months of payments kept in the hot table by `flask archive-payments`
+    app.config['PAYMENT_HOT_MONTHS'] = int(os.environ.get('PAYMENT_HOT_MONTHS', 24))
+
+    # Age a change must reach before GET /api/changes serves it, so that a
+    # transaction that commits after a later sequence number is not skipped
+    app.config['CHANGES_SETTLE_SECONDS'] = float(os.environ.get('CHANGES_SETTLE_SECONDS', 1))
+
+    # 'hard' deletes rows (the database cascades to children); 'archive' hides them
+    app.config['DELETE_MODE'] = os.environ.get('DELETE_MODE', 'hard')
+
+def create_app(config=None):
+    """Build the Flask app. `config` overrides values read from the environment.
+
+    Nothing here opens a database connection, so a gunicorn master can call
+    it once with --preload and fork workers that share the loaded code.
+    """
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
+    if app.config['DELETE_MODE'] not in DELETE_MODES:
+        raise RuntimeError(f'DELETE_MODE must be one of: {", ".join(DELETE_MODES)}')
+    replica_url = app.config['DATABASE_REPLICA_URL']
+    configure_engines(
+        app,
+        database_uri(app.config['DATABASE_URL']),
+        database_uri(replica_url) if replica_url else None
+    )
+
+    # Use the fastest available JSON encoder
+    install_json_provider(app)
+
+    # Initialize extensions
+    db.init_app(app)
+    migrate.init_app(app, db)
+    dispose_engines_after_fork(app)
+    cache.init_app(app)
+    init_read_your_writes(app)
+    metrics.init_app(app)
+    metrics.add_collector(cache.metric_samples)
+    metrics.add_collector(pool_stats.metric_samples)
+    metrics.add_collector(compression.metric_samples)
+    metrics.add_collector(admission.metric_samples)
+    # After metrics, so shed requests are still timed and counted per route
+    admission.init_app(app)
+    # Registered after metrics so its hook runs first and sizes are measured on the wire
+    compression.init_app(app)
+
+    # Enable CORS
+    CORS(app)
+
+    app.register_blueprint(api)
+    for command in CLI_COMMANDS:
+        app.cli.add_command(command)
+
+    # Database teardown
+    @app.teardown_appcontext
+    def shutdown_session(exception=None):
+        db.session.remove()
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=os.environ.get('FLASK_DEBUG', False))
\ No newline at end of file
+    create_app().run(debug=os.environ.get('FLASK_DEBUG', False))
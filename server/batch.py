@@ -0,0 +1,112 @@
+from collections import defaultdict
+from flask import current_app, request
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound
+from models import Property, Tenant, Payment, PaymentHistory
+
+# Sub-requests accepted per POST /api/batch
+MAX_BATCH_REQUESTS = 100
+
+# Ids accepted per ?ids= list
+MAX_IDS = 100
+
+# Detail endpoints answered from one IN (...) query per resource
+DETAIL_ENDPOINTS = {
+    'api.handle_property': Property,
+    'api.handle_tenant': Tenant,
+    'api.handle_payment': Payment
+}
+
+# Where ids missing from a detail model are looked up next; archived
+# payments stay readable, as they are from GET /api/payments/<id>
+DETAIL_FALLBACKS = {Payment: PaymentHistory}
+
+# The only views a sub-request may run: JSON resource lists and details.
+# Exports, reports and the admin and stats views are never dispatched
+BATCH_ENDPOINTS = {'api.handle_properties', 'api.handle_tenants', 'api.handle_payments',
+                   *DETAIL_ENDPOINTS}
+
+
+def parse_ids(value):
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError('ids must be a comma-separated list of integers')
+    if not ids:
+        raise ValueError('ids must not be empty')
+    if len(ids) > MAX_IDS:
+        raise ValueError(f'At most {MAX_IDS} ids per request')
+    # Keep the caller's order, drop repeats
+    return list(dict.fromkeys(ids))
+
+def fetch_by_ids(model, ids, options=()):
+    rows = model.query.options(*options).filter(model.id.in_(ids)).all()
+    return {row.id: row for row in rows}
+
+def _error(e):
+    return e.code, {'success': False, 'error': e.name, 'message': e.description}
+
+def _dispatch(path):
+    # Runs the view directly: the batch request already went through the
+    # before/after request hooks once
+    with current_app.test_request_context(path, method='GET'):
+        try:
+            rule, view_args = request.url_rule, request.view_args
+            if request.routing_exception is not None:
+                raise request.routing_exception
+            response = current_app.make_response(
+                current_app.view_functions[rule.endpoint](**view_args)
+            )
+        except HTTPException as e:
+            return _error(e)
+        return response.status_code, response.get_json(silent=True)
+
+def _fetch_details(model, ids):
+    found = fetch_by_ids(model, ids, model.serializer.load_options(None))
+    fallback = DETAIL_FALLBACKS.get(model)
+    missing = ids - found.keys()
+    if fallback is not None and missing:
+        found.update(fetch_by_ids(fallback, missing, fallback.serializer.load_options(None)))
+    return found
+
+def run_batch(paths):
+    """Answer a list of GET paths, grouping plain detail reads by resource."""
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        raise ValueError('requests must be a list of paths')
+    if len(paths) > MAX_BATCH_REQUESTS:
+        raise ValueError(f'At most {MAX_BATCH_REQUESTS} requests per batch')
+
+    adapter = current_app.url_map.bind('localhost')
+    rejected = {}
+    details = {}
+    wanted = defaultdict(set)
+    for index, path in enumerate(paths):
+        try:
+            endpoint, view_args = adapter.match(path.partition('?')[0], method='GET')
+        except HTTPException as e:
+            rejected[index] = _error(e)
+            continue
+        if endpoint not in BATCH_ENDPOINTS:
+            rejected[index] = _error(BadRequest(
+                'Only property, tenant and payment lists and details can be batched'))
+            continue
+        model = DETAIL_ENDPOINTS.get(endpoint)
+        if model is not None and '?' not in path:
+            details[index] = (model, view_args['id'])
+            wanted[model].add(view_args['id'])
+
+    found = {model: _fetch_details(model, ids) for model, ids in wanted.items()}
+    results = []
+    for index, path in enumerate(paths):
+        if index in rejected:
+            status, body = rejected[index]
+        elif index in details:
+            model, id = details[index]
+            row = found[model].get(id)
+            if row is None:
+                status, body = _error(NotFound())
+            else:
+                status, body = 200, {'success': True, 'data': row.to_dict()}
+        else:
+            status, body = _dispatch(path)
+        results.append({'path': path, 'status': status, 'body': body})
+    return results
@@ -0,0 +1,101 @@
+"""Cost of deleting one large property: the ORM-loaded cascade this app
+used before, the database's ON DELETE CASCADE, and archiving.
+
+    python benchmarks/delete_bench.py --tenants 200 --months 60
+
+Uses DATABASE_URL, or a scratch SQLite file when it is unset. The
+properties it seeds are deleted or archived by the run.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+def orm_cascade(db, property):
+    # What cascade='all, delete-orphan' without passive_deletes did: load
+    # every tenant and payment into the session and delete them one by one
+    tenants = list(property.tenants)
+    for tenant in tenants:
+        for payment in tenant.payments:
+            db.session.delete(payment)
+    db.session.flush()
+    for tenant in tenants:
+        # The loaded collection would cascade the delete a second time
+        db.session.expire(tenant, ['payments'])
+        db.session.delete(tenant)
+    db.session.flush()
+    db.session.expire(property, ['tenants'])
+    db.session.delete(property)
+
+def database_cascade(db, property):
+    db.session.delete(property)
+
+def archive(db, property):
+    from soft_delete import archive_property
+    archive_property(property)
+
+STRATEGIES = [
+    ('before: ORM-loaded cascade', orm_cascade),
+    ('after: ON DELETE CASCADE', database_cascade),
+    ('after: archive', archive),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=200, help='Tenants in each property.')
+    parser.add_argument('--months', type=int, default=60, help='Months of payments per tenant.')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        path = os.path.join(tempfile.mkdtemp(), 'delete_bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from flask_migrate import upgrade
+    from sqlalchemy import event
+    from app import create_app
+    from aggregates import forget_property
+    from models import db, Property
+    from seed import seed
+
+    app = create_app()
+    with app.app_context():
+        upgrade(directory=os.path.join(SERVER_DIR, 'migrations'))
+        seed(properties=len(STRATEGIES) * args.repeat, tenants_per_property=args.tenants,
+             months=args.months, start_month=date(2020, 1, 1))
+        ids = db.session.scalars(
+            db.select(Property.id).order_by(Property.id.desc()).limit(len(STRATEGIES) * args.repeat)
+        ).all()
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(1))
+
+        print(f'{args.tenants} tenants x {args.months} months per property')
+        print(f'{"":<30} {"seconds":>9} {"statements":>11} {"peak MB":>9}')
+        for name, strategy in STRATEGIES:
+            best = None
+            for _ in range(args.repeat):
+                property = db.session.get(Property, ids.pop())
+                statements.clear()
+                tracemalloc.start()
+                start = time.perf_counter()
+                forget_property(property.id)
+                strategy(db, property)
+                db.session.commit()
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1] / 1e6
+                tracemalloc.stop()
+                db.session.expunge_all()
+                run = (elapsed, len(statements), peak)
+                best = run if best is None or run < best else best
+            print(f'{name:<30} {best[0]:>9.3f} {best[1]:>11} {best[2]:>9.1f}')
+
+if __name__ == '__main__':
+    main()
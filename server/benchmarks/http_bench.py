@@ -0,0 +1,334 @@
+"""HTTP benchmark covering every route in app.py.
+
+Runs each scenario at a fixed concurrency against either an in-process
+server (the default, using DATABASE_URL) or --base-url, and reports
+throughput, p50/p95/p99 latency, SQL statements and bytes per request.
+Bytes are as sent on the wire, so compressed with --gzip.
+
+    python benchmarks/http_bench.py --seed-dataset --output before.json
+    python benchmarks/http_bench.py --output after.json --compare before.json
+
+--seed-dataset resets the database to the fixed synthetic dataset first.
+It is on by default with --compare, so both runs measure the same data;
+--no-seed-dataset benchmarks the database as it is.
+An external server needs SQL_STATEMENT_HEADER=1 for statement counts.
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+# The fixed dataset behind comparable runs
+DATASET = {
+    'properties': 200, 'tenants_per_property': 10, 'months': 24, 'seed_value': 42,
+    'start_month': '2024-01'
+}
+# Last month of the dataset, used for reports, exports and new payments
+MONTH = '2025-12'
+
+
+class Client:
+    def __init__(self, base_url, gzip=False):
+        self.base_url = base_url.rstrip('/')
+        self.gzip = gzip
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        if self.gzip:
+            req.add_header('Accept-Encoding', 'gzip')
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req) as response:
+                payload = response.read()
+                status, headers = response.status, response.headers
+        except urllib.error.HTTPError as e:
+            payload = e.read()
+            status, headers = e.code, e.headers
+        elapsed = time.perf_counter() - start
+        statements = headers.get('X-SQL-Statements')
+        return {
+            'status': status,
+            'elapsed': elapsed,
+            'bytes': len(payload),
+            'statements': int(statements) if statements is not None else None,
+            'body': payload
+        }
+
+    def json(self, method, path, body=None):
+        response = self.request(method, path, body)
+        payload = response['body']
+        if payload[:2] == b'\x1f\x8b':
+            payload = gzip.decompress(payload)
+        return json.loads(payload)
+
+def start_local_server(with_cache, seed_dataset, with_admission=False):
+    os.environ['SQL_STATEMENT_HEADER'] = '1'
+    # Shedding would turn slow scenarios into fast 503s
+    os.environ['ADMISSION_ENABLED'] = '1' if with_admission else '0'
+    from werkzeug.serving import make_server
+    from app import create_app
+    from cache import cache
+
+    app = create_app()
+    cache.enabled = with_cache
+    if seed_dataset:
+        from flask_migrate import upgrade
+        from seed import seed
+        dataset = dict(DATASET, start_month=datetime.strptime(DATASET['start_month'], '%Y-%m').date())
+        with app.app_context():
+            upgrade(directory=os.path.join(SERVER_DIR, 'migrations'))
+            seed(reset=True, **dataset)
+    # Per-request access logging would dominate the measurements
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+def sample_ids(client, resource, count=500):
+    rows = client.json('GET', f'/api/{resource}?fields=id&limit={count}')['data']
+    return [row['id'] for row in rows]
+
+def deep_page(client, resource, per_page):
+    total = client.json('GET', f'/api/{resource}?per_page=1')['total']
+    return max(1, int(total * 0.9) // per_page)
+
+def build_scenarios(client):
+    property_ids = sample_ids(client, 'properties')
+    tenant_ids = sample_ids(client, 'tenants')
+    payment_ids = sample_ids(client, 'payments')
+    if not (property_ids and tenant_ids and payment_ids):
+        raise SystemExit('The database is empty; run with --seed-dataset')
+    # The feed scenario reads the changes made after this point, such as the
+    # rows prepare_deletes() creates
+    feed_cursor = client.json('GET', '/api/changes')['next_cursor']
+    month = MONTH
+
+    def pick(ids):
+        return lambda: random.choice(ids)
+
+    def new_property():
+        return {'name': 'Bench Court', 'address': '1 Bench Rd', 'bedrooms': 2, 'rent': 1500}
+
+    def new_tenant():
+        return {
+            'name': 'Bench Tenant', 'phone': '0700000000',
+            'email': f'bench-{uuid.uuid4().hex}@example.com',
+            'unit_id': 'B1', 'property_id': random.choice(property_ids)
+        }
+
+    def new_payment():
+        return {
+            'payment_type': 'Rent', 'amount': 1500, 'payment_date': f'{month}-01',
+            'tenant_id': random.choice(tenant_ids)
+        }
+
+    # Rows for the delete scenarios are created up front, one per request
+    created = {'properties': [], 'tenants': [], 'payments': []}
+
+    def prepare_deletes(requests):
+        for _ in range(requests):
+            created['properties'].append(client.json('POST', '/api/properties', new_property())['data']['id'])
+            created['payments'].append(client.json('POST', '/api/payments', new_payment())['data']['id'])
+            created['tenants'].append(client.json('POST', '/api/tenants', new_tenant())['data']['id'])
+
+    def pop(resource):
+        lock = threading.Lock()
+
+        def take():
+            with lock:
+                return created[resource].pop()
+        return take
+
+    scenarios = []
+    for resource, ids in (('properties', property_ids), ('tenants', tenant_ids), ('payments', payment_ids)):
+        page = deep_page(client, resource, 20)
+        scenarios += [
+            (f'list {resource} shallow', 'GET', lambda r=resource: f'/api/{r}?page=1&per_page=20', None),
+            (f'list {resource} deep', 'GET', lambda r=resource, p=page: f'/api/{r}?page={p}&per_page=20', None),
+            (f'list {resource} keyset', 'GET', lambda r=resource: f'/api/{r}?limit=20', None),
+            (f'get {resource}', 'GET', lambda r=resource, i=pick(ids): f'/api/{r}/{i()}', None),
+        ]
+    scenarios += [
+        ('list payments 1000 rows', 'GET', lambda: '/api/payments?limit=1000', None),
+        ('list payments 1000 columnar', 'GET', lambda: '/api/payments?limit=1000&format=columnar', None),
+        ('get property with includes', 'GET',
+         lambda i=pick(property_ids): f'/api/properties/{i()}?include=tenants,tenants.payments'
+                                      '&limit[tenants.payments]=3', None),
+        ('get tenant with includes', 'GET',
+         lambda i=pick(tenant_ids): f'/api/tenants/{i()}?include=payments,property', None),
+        ('changes feed', 'GET', lambda: f'/api/changes?since={feed_cursor}', None),
+        ('list tenants by ids', 'GET',
+         lambda: '/api/tenants?ids=' + ','.join(str(random.choice(tenant_ids)) for _ in range(20)), None),
+        ('batch details', 'POST', lambda: '/api/batch', lambda: {'requests': [
+            f'/api/{r}/{random.choice(ids)}'
+            for r, ids in (('tenants', tenant_ids), ('properties', property_ids)) for _ in range(10)
+        ]}),
+        ('create property', 'POST', lambda: '/api/properties', new_property),
+        ('create tenant', 'POST', lambda: '/api/tenants', new_tenant),
+        ('create payment', 'POST', lambda: '/api/payments', new_payment),
+        ('update property', 'PUT', lambda i=pick(property_ids): f'/api/properties/{i()}', lambda: {'rent': 1600}),
+        ('update tenant', 'PUT', lambda i=pick(tenant_ids): f'/api/tenants/{i()}', lambda: {'phone': '0711111111'}),
+        ('update payment', 'PUT', lambda i=pick(payment_ids): f'/api/payments/{i()}', lambda: {'status': 'paid'}),
+        ('delete payment', 'DELETE', lambda t=pop('payments'): f'/api/payments/{t()}', None),
+        ('delete tenant', 'DELETE', lambda t=pop('tenants'): f'/api/tenants/{t()}', None),
+        ('delete property', 'DELETE', lambda t=pop('properties'): f'/api/properties/{t()}', None),
+        ('bulk payments', 'POST', lambda: '/api/payments/bulk', lambda: [new_payment() for _ in range(100)]),
+        ('bulk tenants', 'POST', lambda: '/api/tenants/bulk', lambda: [new_tenant() for _ in range(100)]),
+        ('export payments', 'GET', lambda: f'/api/payments/export?format=ndjson&start_date={month}-01', None),
+        ('export tenants', 'GET', lambda: '/api/tenants/export?format=csv', None),
+        ('report rent-roll', 'GET', lambda: f'/api/reports/rent-roll?month={month}', None),
+        ('report arrears', 'GET', lambda: f'/api/reports/arrears?month={month}', None),
+        ('cache stats', 'GET', lambda: '/api/cache/stats', None),
+        ('pool stats', 'GET', lambda: '/api/pool/stats', None),
+        ('metrics', 'GET', lambda: '/api/metrics', None),
+        ('health', 'GET', lambda: '/api/health', None),
+    ]
+    return scenarios, prepare_deletes
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_scenario(client, scenario, requests, concurrency):
+    name, method, path, body = scenario
+
+    def call(_):
+        return client.request(method, path(), body() if body else None)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(r['elapsed'] for r in results)
+    statements = [r['statements'] for r in results if r['statements'] is not None]
+    return {
+        'requests': requests,
+        'errors': sum(r['status'] >= 400 for r in results),
+        'throughput': requests / wall,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'sql_per_request': sum(statements) / len(statements) if statements else None,
+        'bytes_per_request': sum(r['bytes'] for r in results) / requests
+    }
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline['scenarios'].get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f'{name}: p95 {previous["p95_ms"]:.1f} -> {current["p95_ms"]:.1f} ms')
+        if current['throughput'] < previous['throughput'] * (1 - threshold):
+            regressions.append(
+                f'{name}: throughput {previous["throughput"]:.0f} -> {current["throughput"]:.0f} req/s')
+        if (current['sql_per_request'] or 0) > (previous['sql_per_request'] or 0):
+            regressions.append(
+                f'{name}: SQL/request {previous["sql_per_request"]} -> {current["sql_per_request"]}')
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', help='Benchmark a running server instead of an in-process one.')
+    parser.add_argument('--seed-dataset', action='store_true', default=None,
+                        help='Reset the database to the fixed dataset (the default with --compare).')
+    parser.add_argument('--no-seed-dataset', action='store_false', dest='seed_dataset',
+                        help='Use the database as it is, even with --compare.')
+    parser.add_argument('--with-cache', action='store_true', help='Leave the response cache on.')
+    parser.add_argument('--with-admission', action='store_true', help='Leave admission control on.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--only', help='Comma-separated scenario name prefixes to run.')
+    parser.add_argument('--output', help='Write results as JSON here.')
+    parser.add_argument('--compare', help='Baseline JSON to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression (0.2 = 20%%).')
+    parser.add_argument('--random-seed', type=int, default=1)
+    parser.add_argument('--gzip', action='store_true', help='Send Accept-Encoding: gzip.')
+    args = parser.parse_args()
+
+    if args.seed_dataset is None:
+        # A comparison against a baseline only means something on the same data
+        args.seed_dataset = bool(args.compare)
+
+    random.seed(args.random_seed)
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server, base_url = start_local_server(args.with_cache, args.seed_dataset, args.with_admission)
+    client = Client(base_url, args.gzip)
+
+    scenarios, prepare_deletes = build_scenarios(client)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(','))
+        scenarios = [s for s in scenarios if s[0].startswith(prefixes)]
+    if any(s[0].startswith('delete') for s in scenarios):
+        prepare_deletes(args.requests)
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'dataset': DATASET,
+            'cache': args.with_cache,
+            'admission': args.with_admission,
+            'gzip': args.gzip
+        },
+        'scenarios': {}
+    }
+    print(f'{"scenario":<26} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL":>5} {"bytes":>9} err')
+    for scenario in scenarios:
+        result = run_scenario(client, scenario, args.requests, args.concurrency)
+        results['scenarios'][scenario[0]] = result
+        sql = result['sql_per_request']
+        print(f'{scenario[0]:<26} {result["throughput"]:>8.0f} {result["p50_ms"]:>8.1f}'
+              f' {result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f}'
+              f' {"-" if sql is None else f"{sql:.1f}":>5} {result["bytes_per_request"]:>9.0f}'
+              f' {result["errors"]}')
+
+    if server:
+        server.shutdown()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print('\nRegressions:\n  ' + '\n  '.join(regressions))
+            sys.exit(1)
+        print('\nNo regressions beyond the threshold.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Latency of cheap requests while exports and deep pages flood the server,
+with admission control off and on.
+
+    python benchmarks/overload_bench.py --flood 64 --seconds 10
+
+--flood threads, spread over --processes client processes, request exports
+and 1000-row pages back to back, while one probe thread requests
+/api/health and single tenants in turn. Without admission control the
+flood takes every pooled connection and the probes queue behind it; with
+it the flood is shed with 503s and the probes stay fast. Uses DATABASE_URL
+like http_bench.py (run that with --seed-dataset first).
+"""
+import argparse
+import collections
+import multiprocessing
+import random
+import threading
+import time
+
+from http_bench import Client, percentile, sample_ids, start_local_server
+
+FLOOD_PATHS = (
+    '/api/payments/export?format=ndjson',
+    '/api/tenants/export?format=csv',
+    '/api/payments?limit=1000',
+    '/api/payments?page=50&per_page=1000',
+)
+
+
+def flood_process(base_url, threads, seconds):
+    # Runs in a separate process so the client threads do not compete with
+    # the server for the GIL
+    client = Client(base_url)
+    statuses = collections.Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def flooder():
+        while time.perf_counter() < deadline:
+            response = client.request('GET', random.choice(FLOOD_PATHS))
+            with lock:
+                statuses[response['status']] += 1
+
+    workers = [threading.Thread(target=flooder) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return statuses
+
+def pool_timeouts(client):
+    return sum(stats['timeouts'] for stats in client.json('GET', '/api/pool/stats')['data'].values())
+
+def run(admission_enabled, flood, processes, seconds):
+    server, base_url = start_local_server(with_cache=False, seed_dataset=False,
+                                          with_admission=admission_enabled)
+    client = Client(base_url)
+    tenant_ids = sample_ids(client, 'tenants')
+    timeouts_before = pool_timeouts(client)
+
+    with multiprocessing.get_context('spawn').Pool(processes) as pool:
+        pending = pool.starmap_async(flood_process, [(base_url, flood // processes, seconds)] * processes)
+        time.sleep(1)
+        probes = {'health': [], 'get tenant': []}
+        probe_errors = 0
+        deadline = time.perf_counter() + seconds - 1
+        while time.perf_counter() < deadline:
+            for name, path in (('health', '/api/health'),
+                               ('get tenant', f'/api/tenants/{random.choice(tenant_ids)}')):
+                response = client.request('GET', path)
+                probes[name].append(response['elapsed'])
+                probe_errors += response['status'] >= 400
+        statuses = sum(pending.get(), collections.Counter())
+    timeouts = pool_timeouts(client) - timeouts_before
+    server.shutdown()
+    return probes, probe_errors, statuses, timeouts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--flood', type=int, default=64, help='Threads sending heavy requests.')
+    parser.add_argument('--processes', type=int, default=4, help='Client processes for the flood.')
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f'{"admission":<10} {"probe":<11} {"p50 ms":>8} {"p99 ms":>8} {"max ms":>8}'
+          f' {"errors":>7}  flood statuses, pool timeouts')
+    for enabled in (False, True):
+        probes, probe_errors, statuses, timeouts = run(enabled, args.flood, args.processes, args.seconds)
+        label = 'on' if enabled else 'off'
+        for name, latencies in probes.items():
+            latencies.sort()
+            print(f'{label:<10} {name:<11} {percentile(latencies, 0.5) * 1000:>8.1f}'
+                  f' {percentile(latencies, 0.99) * 1000:>8.1f} {latencies[-1] * 1000:>8.1f}'
+                  f' {probe_errors:>7}  {dict(sorted(statuses.items()))}, {timeouts}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Reconciling a large bank statement: time, peak memory and ledger
+consistency afterwards.
+
+    python benchmarks/reconcile_bench.py --lines 500000
+
+Seeds a dataset, invoices --invoice-months further months so there are
+plenty of pending payments, and writes a statement that settles every one
+of them, a few days late, followed by unmatched lines up to --lines.
+Uses DATABASE_URL, or a scratch SQLite file when it is unset. The pending
+payments it finds are marked paid by the run.
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+def write_statement(path, pending, lines, rng):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'tenant_id', 'amount', 'reference'])
+        for tenant_id, amount, payment_date in pending:
+            day = payment_date + timedelta(days=rng.randint(0, 3))
+            writer.writerow([day.isoformat(), tenant_id, f'{amount:.2f}', f'RENT {tenant_id}'])
+        tenant_ids = [tenant_id for tenant_id, _, _ in pending] or [1]
+        for i in range(max(0, lines - len(pending))):
+            day = date(2024, 1, 1) + timedelta(days=i % 700)
+            writer.writerow([day.isoformat(), rng.choice(tenant_ids), f'{rng.uniform(1, 99):.2f}', 'MISC'])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=500000)
+    parser.add_argument('--properties', type=int, default=500)
+    parser.add_argument('--invoice-months', type=int, default=3)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        path = os.path.join(tempfile.mkdtemp(), 'reconcile_bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from flask_migrate import upgrade
+    from sqlalchemy import select
+    from app import create_app
+    from aggregates import rebuild_summaries, verify_balances
+    from invoices import generate_invoices
+    from models import db, Payment, MonthlyPropertySummary
+    from reconcile import reconcile
+    from seed import add_months, seed
+
+    app = create_app()
+    rng = random.Random(1)
+    with app.app_context():
+        upgrade(directory=os.path.join(SERVER_DIR, 'migrations'))
+        start_month = date(2024, 1, 1)
+        seed(properties=args.properties, tenants_per_property=10, months=12, start_month=start_month)
+        for offset in range(args.invoice_months):
+            generate_invoices(add_months(start_month, 12 + offset))
+        pending = db.session.execute(
+            select(Payment.tenant_id, Payment.amount, Payment.payment_date)
+            .where(Payment.status == 'pending')
+        ).all()
+        db.session.commit()
+
+        statement = os.path.join(tempfile.mkdtemp(), 'statement.csv')
+        write_statement(statement, pending, args.lines, rng)
+        print(f'{len(pending)} pending payments, {max(args.lines, len(pending))} statement lines '
+              f'({os.path.getsize(statement) / 1e6:.1f} MB)')
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        with open(statement, newline='') as lines:
+            totals, _ = reconcile(lines, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f'{elapsed:.2f}s, {totals["lines"] / elapsed:,.0f} lines/s, '
+              f'peak RSS grew {(rss_after - rss_before) / 1024:.1f} MB')
+        print(f'matched {totals["matched"]}, unmatched {totals["unmatched"]}, '
+              f'invalid {totals["invalid"]}, already settled {totals["already_settled"]}')
+
+        # The deltas applied per chunk must agree with a recount
+        def snapshot():
+            return {
+                (row.property_id, row.month): (round(row.paid_amount, 2), round(row.pending_amount, 2),
+                                               row.payment_count)
+                for row in MonthlyPropertySummary.query
+            }
+        summaries = snapshot()
+        rebuild_summaries()
+        print(f'summaries consistent: {summaries == snapshot()}, '
+              f'balances drifted: {len(verify_balances())}')
+
+if __name__ == '__main__':
+    main()
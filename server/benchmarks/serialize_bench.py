@@ -0,0 +1,89 @@
+"""Rows/second for serializing payment rows, before and after the
+precompiled serializers, and the size of the encoded payload, raw and
+gzipped, for the row-per-object and columnar list formats.
+
+    python benchmarks/serialize_bench.py --rows 10000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Payment  # noqa: E402
+from serializers import orjson  # noqa: E402
+
+
+def legacy_to_dict(payment):
+    # BaseModel.to_dict + Payment.to_dict as they were before serializers
+    data = {c.name: getattr(payment, c.name) for c in payment.__table__.columns}
+    data['payment_date'] = payment.payment_date.isoformat()
+    data['received_at'] = payment.received_at.isoformat()
+    if payment.tenant_name is not None:
+        data['tenant_name'] = payment.tenant_name
+    return data
+
+def make_payments(count):
+    payments = []
+    for i in range(count):
+        payment = Payment(
+            id=i + 1,
+            payment_type='Rent',
+            status='paid' if i % 3 else 'pending',
+            amount=1000.0 + i % 500,
+            payment_date=date(2025, i % 12 + 1, 1),
+            received_at=datetime(2025, i % 12 + 1, 3, 10, 30),
+            tenant_id=i % 977 + 1
+        )
+        payment.tenant_name = f'Tenant {i % 977}'
+        payments.append(payment)
+    return payments
+
+def measure(label, rows, serialize, encode, repeat, body=None):
+    # body(data) wraps the serialized rows the way the list response does
+    body = body or (lambda data: {'success': True, 'data': data})
+    best_serialize = best_total = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = serialize(rows)
+        middle = time.perf_counter()
+        encoded = encode(body(data))
+        end = time.perf_counter()
+        best_serialize = min(best_serialize, middle - start)
+        best_total = min(best_total, end - start)
+    print(f'{label:<36} {len(rows) / best_serialize:>11,.0f} {len(rows) / best_total:>11,.0f}'
+          f' {(best_total - best_serialize) * 1000:>9.1f} {len(encoded):>11,}'
+          f' {len(gzip.compress(encoded, compresslevel=6)):>11,}')
+
+def each(serialize):
+    return lambda rows: [serialize(row) for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_payments(args.rows)
+    serializer = Payment.serializer
+    sparse = serializer.parse_fields('amount,status,payment_date')
+    stdlib = lambda obj: json.dumps(obj).encode()  # noqa: E731
+
+    encode = orjson.dumps if orjson is not None else stdlib
+    columnar = lambda data: {'success': True, 'columns': serializer.columns_for(), 'rows': data}  # noqa: E731
+
+    print(f'{"":<36} {"to_dict/s":>11} {"+encode/s":>11} {"encode ms":>9} {"bytes":>11} {"gzip":>11}')
+    measure('before: reflective to_dict + json', rows, each(legacy_to_dict), stdlib, args.repeat)
+    measure('after: compiled + json', rows, each(serializer), stdlib, args.repeat)
+    if orjson is not None:
+        measure('after: compiled + orjson', rows, each(serializer), orjson.dumps, args.repeat)
+        measure('after: compiled sparse + orjson', rows,
+                each(lambda row: serializer(row, sparse)), orjson.dumps, args.repeat)
+    measure('columnar', rows, serializer.rows, encode, args.repeat, columnar)
+
+if __name__ == '__main__':
+    main()
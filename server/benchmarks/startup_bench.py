@@ -0,0 +1,100 @@
+"""gunicorn boot time and per-worker memory, with and without --preload.
+
+Starts gunicorn with gunicorn.conf.py, times how long it takes until every
+worker has loaded the app, then reads each worker's memory from
+/proc/<pid>/smaps_rollup (Linux only). USS is the memory private to a worker;
+PSS also charges it a share of the pages it shares with the master and the
+other workers.
+
+    python benchmarks/startup_bench.py --workers 4 --runs 3
+
+Uses DATABASE_URL like the server; nothing connects to it during boot.
+"""
+import argparse
+import os
+import queue
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READY = re.compile(r'Worker ready \(pid: (\d+)\)')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def memory_kb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty']
+    }
+
+def boot(workers, preload, timeout):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_PRELOAD='1' if preload else '0',
+               PORT=str(port), GUNICORN_THREADS='1')
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}'],
+        cwd=SERVER_DIR, env=env, stderr=subprocess.PIPE, text=True
+    )
+    lines = queue.Queue()
+    threading.Thread(target=lambda: [lines.put(line) for line in process.stderr], daemon=True).start()
+    pids = []
+    try:
+        while len(pids) < workers:
+            remaining = timeout - (time.perf_counter() - start)
+            try:
+                line = lines.get(timeout=max(0.0, remaining))
+            except queue.Empty:
+                raise RuntimeError(f'only {len(pids)} of {workers} workers ready after {timeout}s')
+            match = READY.search(line)
+            if match:
+                pids.append(int(match.group(1)))
+        seconds = time.perf_counter() - start
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health') as response:
+            assert response.status == 200
+        return seconds, memory_kb(process.pid), [memory_kb(pid) for pid in pids]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    print(f'{"":<12} {"boot s":>8} {"worker USS MB":>14} {"worker PSS MB":>14} {"total PSS MB":>13}')
+    for preload in (False, True):
+        boots, uss, pss, total = [], [], [], []
+        for _ in range(args.runs):
+            seconds, master, workers = boot(args.workers, preload, args.timeout)
+            boots.append(seconds)
+            uss.append(statistics.mean(w['uss'] for w in workers) / 1024)
+            pss.append(statistics.mean(w['pss'] for w in workers) / 1024)
+            total.append((master['pss'] + sum(w['pss'] for w in workers)) / 1024)
+        label = 'preload' if preload else 'no preload'
+        print(f'{label:<12} {statistics.median(boots):>8.2f} {statistics.median(uss):>14.1f}'
+              f' {statistics.median(pss):>14.1f} {statistics.median(total):>13.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+import json
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from models import db, Property, Tenant, Payment
+from aggregates import record_inserted_payments
+from changes import record_changes
+from schemas import PAYMENT_SCHEMA, TENANT_SCHEMA
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson')
+
+
+def iter_records(request):
+    if request.mimetype in NDJSON_MIMETYPES:
+        return _iter_ndjson(request.stream)
+    if not request.is_json:
+        raise ValueError('Content-Type must be application/json or application/x-ndjson')
+    data = request.get_json()
+    if not isinstance(data, list):
+        raise ValueError('Request body must be a JSON array')
+    return iter(data)
+
+def _iter_ndjson(stream):
+    # Lines are decoded one at a time so the body is never held in memory
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield ValueError('Invalid JSON')
+
+def _existing(column, values, include_archived=False):
+    values = set(values)
+    if not values:
+        return set()
+    stmt = select(column).where(column.in_(values)).execution_options(include_archived=include_archived)
+    return set(db.session.execute(stmt).scalars())
+
+def check_payments(chunk, errors, seen):
+    tenant_ids = _existing(Tenant.id, (row['tenant_id'] for _, row in chunk))
+    valid = []
+    for index, row in chunk:
+        if row['tenant_id'] not in tenant_ids:
+            errors.append({'index': index, 'message': 'Tenant does not exist'})
+        else:
+            valid.append((index, row))
+    return valid
+
+def check_tenants(chunk, errors, seen):
+    property_ids = _existing(Property.id, (row['property_id'] for _, row in chunk))
+    # Archived tenants keep their email under the unique constraint
+    taken = _existing(Tenant.email, (row['email'] for _, row in chunk), include_archived=True)
+    valid = []
+    for index, row in chunk:
+        if row['property_id'] not in property_ids:
+            errors.append({'index': index, 'message': 'Property does not exist'})
+        elif row['email'] in taken or row['email'] in seen:
+            errors.append({'index': index, 'message': 'Email already in use'})
+        else:
+            seen.add(row['email'])
+            valid.append((index, row))
+    return valid
+
+def _insert_chunk(model, rows, errors, on_insert):
+    if not rows:
+        return 0
+    try:
+        # A list of parameter sets is sent as batched multi-row INSERTs
+        ids = db.session.scalars(insert(model).returning(model.id), [row for _, row in rows]).all()
+        record_changes(model, ids)
+        if on_insert:
+            on_insert([row for _, row in rows])
+        db.session.commit()
+        return len(rows)
+    except IntegrityError:
+        db.session.rollback()
+
+    # Something in the chunk violated a constraint; retry row by row so
+    # only the offending rows are reported
+    inserted = 0
+    for index, row in rows:
+        try:
+            ids = db.session.scalars(insert(model).returning(model.id), [row]).all()
+            record_changes(model, ids)
+            if on_insert:
+                on_insert([row])
+            db.session.commit()
+            inserted += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            errors.append({'index': index, 'message': str(e.orig)})
+    return inserted
+
+def _ingest_chunk(model, schema, check, chunk, errors, seen, on_insert):
+    # The whole chunk is validated before one reference query checks it
+    rows = schema.load_many(chunk, errors)
+    return _insert_chunk(model, check(rows, errors, seen), errors, on_insert)
+
+def ingest(records, model, schema, check, chunk_size, on_insert=None):
+    errors = []
+    seen = set()
+    inserted = 0
+    chunk = []
+    for index, record in enumerate(records):
+        chunk.append((index, record))
+        if len(chunk) >= chunk_size:
+            inserted += _ingest_chunk(model, schema, check, chunk, errors, seen, on_insert)
+            chunk = []
+    inserted += _ingest_chunk(model, schema, check, chunk, errors, seen, on_insert)
+    errors.sort(key=lambda e: e['index'])
+    return {
+        'inserted': inserted,
+        'failed': len(errors),
+        'errors': errors
+    }
+
+def ingest_payments(records, chunk_size):
+    return ingest(records, Payment, PAYMENT_SCHEMA, check_payments, chunk_size,
+                  on_insert=record_inserted_payments)
+
+def ingest_tenants(records, chunk_size):
+    return ingest(records, Tenant, TENANT_SCHEMA, check_tenants, chunk_size)
@@ -0,0 +1,198 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from flask import Response, request
+from database import pinned_to_primary
+
+# Fields whose value names another cached resource the response depends on,
+# e.g. a tenant detail shows its property's name
+DEPENDENCY_FIELDS = {
+    'property_id': 'properties',
+    'tenant_id': 'tenants'
+}
+
+# ?include= names and the resource whose writes change them
+INCLUDE_RESOURCES = {
+    'tenants': 'tenants',
+    'tenant': 'tenants',
+    'payments': 'payments',
+    'property': 'properties'
+}
+
+
+class ResponseCache:
+    """In-process LRU cache of GET responses with TTL and tag invalidation.
+
+    Every entry is tagged with the resources it was built from ('tenants'
+    for the tenant list, 'tenants:3' for one tenant). Writes bump the
+    version of the tags they touch and drop the entries carrying them.
+    """
+
+    def __init__(self, max_entries=1024, ttl=5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._keys_by_tag = defaultdict(set)
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_ENABLED', True)
+        app.config.setdefault('RESPONSE_CACHE_TTL', 5.0)
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+        self.enabled = app.config['RESPONSE_CACHE_ENABLED']
+        self.ttl = float(app.config['RESPONSE_CACHE_TTL'])
+        self.max_entries = int(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        app.extensions['response_cache'] = self
+
+    def versions(self, tags):
+        with self._lock:
+            return tuple(self._versions[tag] for tag in tags)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry, tags, versions):
+        with self._lock:
+            # Skip the store if a write invalidated these tags while the
+            # response was being built
+            if tuple(self._versions[tag] for tag in tags) != versions:
+                return
+            entry['expires'] = time.monotonic() + self.ttl
+            entry['tags'] = tags
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            for tag in tags:
+                self._keys_by_tag[tag].add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, old = self._entries.popitem(last=False)
+                self._untag(old_key, old['tags'])
+
+    def _untag(self, key, tags):
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def invalidate(self, *tags):
+        with self._lock:
+            self.invalidations += 1
+            for tag in tags:
+                self._versions[tag] += 1
+                for key in self._keys_by_tag.pop(tag, ()):
+                    entry = self._entries.pop(key, None)
+                    if entry is not None:
+                        self._untag(key, entry['tags'])
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += 1
+            for tag in list(self._versions):
+                self._versions[tag] += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+    def metric_samples(self):
+        stats = self.stats()
+        return [
+            ('response_cache_hits_total', 'counter', 'Response cache hits', [('', stats['hits'])]),
+            ('response_cache_misses_total', 'counter', 'Response cache misses', [('', stats['misses'])]),
+            ('response_cache_not_modified_total', 'counter', '304 responses served from the cache',
+             [('', stats['not_modified'])]),
+            ('response_cache_entries', 'gauge', 'Entries in the response cache', [('', stats['entries'])]),
+        ]
+
+cache = ResponseCache()
+
+
+def _entry_tags(resource, view_args, data):
+    if 'id' not in view_args:
+        return (resource,)
+    tags = [f'{resource}:{view_args["id"]}']
+    # Nested rows can change without touching the parent, so a compound
+    # document depends on every write to the included resources
+    for path in request.args.get('include', '').split(','):
+        for name in path.strip().split('.'):
+            if name in INCLUDE_RESOURCES and INCLUDE_RESOURCES[name] not in tags:
+                tags.append(INCLUDE_RESOURCES[name])
+    if isinstance(data, dict):
+        for field, dependency in DEPENDENCY_FIELDS.items():
+            if data.get(field) is not None:
+                tags.append(f'{dependency}:{data[field]}')
+    return tuple(tags)
+
+def _not_modified(etag):
+    cache.not_modified += 1
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def cached(resource):
+    """Serve GETs of a view from the response cache, with ETag support."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if request.method != 'GET' or not cache.enabled:
+                return view(**view_args)
+
+            key = request.full_path
+            # Inside its read-your-writes window a client reads the primary;
+            # the cached entry may have been built from the lagging replica.
+            # Its fresh response replaces that entry below.
+            entry = None if pinned_to_primary() else cache.get(key)
+            if entry is None:
+                base_tags = _entry_tags(resource, view_args, None)
+                versions = cache.versions(base_tags)
+                response = view(**view_args)
+                if isinstance(response, tuple) or response.status_code != 200:
+                    return response
+                body = response.get_data()
+                data = response.get_json(silent=True) or {}
+                tags = _entry_tags(resource, view_args, data.get('data'))
+                # ETag: the tag versions (bumped by every write) plus a digest
+                # of the body, which carries the rows' updated_at
+                stamp = '.'.join(str(v) for v in versions)
+                etag = f'{stamp}-{hashlib.sha1(body).hexdigest()[:20]}'
+                entry = {'body': body, 'mimetype': response.mimetype, 'etag': etag}
+                cache.set(key, entry, tags, versions + cache.versions(tags[len(base_tags):]))
+
+            # Weak comparison: gzip turns the ETag weak on the way out
+            if request.if_none_match.contains_weak(entry['etag']):
+                return _not_modified(entry['etag'])
+            response = Response(entry['body'], mimetype=entry['mimetype'])
+            response.set_etag(entry['etag'])
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
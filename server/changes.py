@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, insert, select
+from database import RoutingSession
+from models import db, Property, Tenant, Payment, PaymentHistory, ChangeLog
+
+# The change feed. ORM writes are picked up from every flush; set-based
+# statements (cascading deletes, archiving, invoices, bulk inserts) report
+# the rows they touch with record_changes(). Changes are buffered on the
+# session and written to change_log just before COMMIT, so sequence numbers
+# follow commit order as closely as the database allows.
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+# Feed resource name: the model written and the model read back from
+RESOURCES = {
+    'properties': (Property, Property),
+    'tenants': (Tenant, Tenant),
+    'payments': (Payment, PaymentHistory)
+}
+RESOURCE_OF = {model: name for name, (model, _) in RESOURCES.items()}
+
+DEFAULT_LIMIT = 500
+
+_PENDING = 'pending_changes'
+
+
+def record_changes(model, ids, op=UPSERT):
+    """Add rows changed outside the ORM unit of work to the current transaction's changes."""
+    pending = db.session.info.setdefault(_PENDING, [])
+    resource = RESOURCE_OF[model]
+    pending.extend((resource, id, op) for id in ids)
+
+def _record_deleted_payments(tenant_ids):
+    payment_ids = db.session.scalars(
+        select(PaymentHistory.id).where(PaymentHistory.tenant_id.in_(tenant_ids))
+    ).all()
+    record_changes(Payment, payment_ids, DELETE)
+
+def record_property_delete(property_id):
+    # Tombstones for the rows ON DELETE CASCADE is about to remove
+    tenant_ids = db.session.scalars(
+        select(Tenant.id).where(Tenant.property_id == property_id),
+        execution_options={'include_archived': True}
+    ).all()
+    record_changes(Tenant, tenant_ids, DELETE)
+    _record_deleted_payments(tenant_ids)
+
+def record_tenant_delete(tenant_id):
+    _record_deleted_payments([tenant_id])
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _collect_flushed(session, flush_context):
+    pending = session.info.setdefault(_PENDING, [])
+    for objects, op in ((session.new, UPSERT), (session.dirty, UPSERT), (session.deleted, DELETE)):
+        for obj in objects:
+            resource = RESOURCE_OF.get(type(obj))
+            if resource is None:
+                continue
+            if op == UPSERT and obj in session.dirty and not session.is_modified(obj):
+                continue
+            pending.append((resource, obj.id, op))
+
+@event.listens_for(RoutingSession, 'before_commit')
+def _write_changes(session):
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    # Last operation per row, in the order the rows were last touched
+    latest = {}
+    for resource, id, op in pending:
+        latest.pop((resource, id), None)
+        latest[(resource, id)] = op
+    now = datetime.utcnow()
+    session.execute(insert(ChangeLog), [
+        {'resource': resource, 'row_id': id, 'op': op, 'changed_at': now}
+        for (resource, id), op in latest.items()
+    ])
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING, None)
+
+def head():
+    return db.session.scalar(select(func.max(ChangeLog.seq))) or 0
+
+def changes_since(since, limit=DEFAULT_LIMIT, settle_seconds=0):
+    """Rows changed after sequence number `since`, oldest change first.
+
+    Returns (changes, next_cursor, has_more). Each row appears once, with
+    its current data, or as a tombstone if it has since been deleted or
+    archived. Entries younger than settle_seconds are held back so that a
+    transaction committing out of sequence order is not skipped.
+    """
+    oldest = db.session.scalar(select(func.min(ChangeLog.seq)))
+    if oldest is not None and since < oldest - 1:
+        raise LookupError('since is older than the retained change log')
+
+    entries = db.session.execute(
+        select(ChangeLog.seq, ChangeLog.resource, ChangeLog.row_id, ChangeLog.op, ChangeLog.changed_at)
+        .where(ChangeLog.seq > since)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+    for index, entry in enumerate(entries):
+        if entry.changed_at > cutoff:
+            entries, has_more = entries[:index], True
+            break
+
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.resource, entry.row_id), None)
+        latest[(entry.resource, entry.row_id)] = entry
+    wanted = {}
+    for (resource, id), entry in latest.items():
+        if entry.op == UPSERT:
+            wanted.setdefault(resource, []).append(id)
+    found = {}
+    for resource, ids in wanted.items():
+        model = RESOURCES[resource][1]
+        rows = model.query.options(*model.serializer.load_options(None)).filter(model.id.in_(ids))
+        found[resource] = {row.id: row for row in rows}
+
+    changes = []
+    for (resource, id), entry in latest.items():
+        row = found.get(resource, {}).get(id)
+        change = {'seq': entry.seq, 'resource': resource, 'id': id,
+                  'op': UPSERT if row is not None else DELETE}
+        if row is not None:
+            change['data'] = RESOURCES[resource][1].serializer(row)
+        changes.append(change)
+    next_cursor = entries[-1].seq if entries else since
+    return changes, next_cursor, has_more
+
+@click.command('prune-changes')
+@click.option('--days', default=30, show_default=True, help='Keep this many days of changes.')
+@with_appcontext
+def prune_changes_command(days):
+    """Delete old change_log entries; clients further behind must resync."""
+    newest = head()
+    result = db.session.execute(
+        delete(ChangeLog).where(
+            ChangeLog.changed_at < datetime.utcnow() - timedelta(days=days),
+            # The newest entry stays so an empty log still shows how far it got
+            ChangeLog.seq < newest
+        )
+    )
+    db.session.commit()
+    click.echo(f'Pruned {result.rowcount} change log entries')
@@ -0,0 +1,70 @@
+import gzip
+import threading
+from flask import request
+
+# Bodies worth compressing; exports stream and are left alone
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/csv', 'application/x-ndjson')
+
+
+class Compression:
+    """gzip for buffered responses above a size threshold, when the client
+    sends Accept-Encoding: gzip.
+
+    A compressed body is a different representation, so a strong ETag set by
+    the response cache is weakened; If-None-Match matching is weak anyway.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.min_bytes = 1024
+        self.level = 6
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('GZIP_ENABLED', True)
+        app.config.setdefault('GZIP_MIN_BYTES', 1024)
+        app.config.setdefault('GZIP_LEVEL', 6)
+        self.enabled = app.config['GZIP_ENABLED']
+        self.min_bytes = int(app.config['GZIP_MIN_BYTES'])
+        self.level = int(app.config['GZIP_LEVEL'])
+        app.after_request(self._after_request)
+        app.extensions['compression'] = self
+
+    def _after_request(self, response):
+        if (not self.enabled or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.is_streamed or response.direct_passthrough):
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or not request.accept_encodings['gzip']):
+            return response
+        body = response.get_data()
+        if len(body) < self.min_bytes:
+            return response
+        compressed = gzip.compress(body, compresslevel=self.level)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return response
+
+    def metric_samples(self):
+        return [
+            ('http_responses_compressed_total', 'counter', 'Responses sent gzip-compressed',
+             [('', self.compressed)]),
+            ('http_compression_input_bytes_total', 'counter', 'Body bytes before compression',
+             [('', self.bytes_in)]),
+            ('http_compression_output_bytes_total', 'counter', 'Body bytes after compression',
+             [('', self.bytes_out)]),
+        ]
+
+compression = Compression()
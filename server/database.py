@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+READ_METHODS = ('GET', 'HEAD')
+
+# Cookie telling later GETs from the same client to read from the primary
+# until the replica has had time to catch up with its write
+PRIMARY_COOKIE = 'read_primary_until'
+
+# Session.info key set while the session's transaction holds writes
+_WROTE = 'read_your_writes.wrote'
+
+
+def database_uri(url):
+    url = url.replace('postgres://', 'postgresql://')
+    if url.startswith('postgresql') and 'sslmode=' not in url:
+        url += ('&' if '?' in url else '?') + 'sslmode=require'
+    return url
+
+class PoolStats:
+    """Checkout wait times per bind, recorded by TimedQueuePool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._pools = {}
+
+    def record(self, label, pool, waited, timed_out=False):
+        with self._lock:
+            stats = self._stats.setdefault(label, {
+                'checkouts': 0,
+                'timeouts': 0,
+                'wait_seconds_total': 0.0,
+                'wait_seconds_max': 0.0
+            })
+            self._pools[label] = pool
+            stats['checkouts'] += 1
+            stats['timeouts'] += timed_out
+            stats['wait_seconds_total'] += waited
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], waited)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for label, stats in self._stats.items():
+                pool = self._pools[label]
+                result[label] = dict(
+                    stats,
+                    size=pool.size(),
+                    checked_out=pool.checkedout(),
+                    overflow=pool.overflow()
+                )
+            return result
+
+    def metric_samples(self):
+        snapshot = self.snapshot()
+        families = [
+            ('db_pool_checkouts_total', 'counter', 'Connection checkouts', 'checkouts'),
+            ('db_pool_timeouts_total', 'counter', 'Checkouts that timed out', 'timeouts'),
+            ('db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection',
+             'wait_seconds_total'),
+            ('db_pool_wait_seconds_max', 'gauge', 'Longest wait for a connection', 'wait_seconds_max'),
+            ('db_pool_checked_out', 'gauge', 'Connections currently checked out', 'checked_out'),
+            ('db_pool_overflow', 'gauge', 'Connections above the pool size', 'overflow'),
+        ]
+        return [
+            (name, kind, help_text,
+             [(f'bind="{label}"', stats[key]) for label, stats in snapshot.items()])
+            for name, kind, help_text, key in families
+        ]
+
+pool_stats = PoolStats()
+
+
+def timed_pool_class(label):
+    # A subclass per bind so the label survives Pool.recreate()
+    class TimedQueuePool(QueuePool):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except PoolTimeoutError:
+                pool_stats.record(label, self, time.perf_counter() - start, timed_out=True)
+                raise
+            pool_stats.record(label, self, time.perf_counter() - start)
+            return connection
+
+    TimedQueuePool.__name__ = f'TimedQueuePool[{label}]'
+    return TimedQueuePool
+
+def engine_options(url, config, label):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # In-memory SQLite uses a single static connection; nothing to tune
+        return {}
+    return {
+        'poolclass': timed_pool_class(label),
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE']
+    }
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, and so ON DELETE CASCADE, unless asked per connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+def configure_engines(app, primary_url, replica_url=None):
+    if not event.contains(Engine, 'connect', _enable_sqlite_foreign_keys):
+        event.listen(Engine, 'connect', _enable_sqlite_foreign_keys)
+    app.config['SQLALCHEMY_DATABASE_URI'] = primary_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(primary_url, app.config, 'primary')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {
+            'replica': {'url': replica_url, **engine_options(replica_url, app.config, 'replica')}
+        }
+
+# Apps whose engines a forked child must not share with its parent
+_fork_apps = weakref.WeakSet()
+
+def _dispose_engines_in_child():
+    for app in list(_fork_apps):
+        with app.app_context():
+            for engine in app.extensions['sqlalchemy'].engines.values():
+                # close=False: the parent still owns those sockets; the child
+                # just starts from an empty pool
+                engine.dispose(close=False)
+
+def dispose_engines_after_fork(app):
+    """Give every forked process (gunicorn workers under --preload) fresh
+    connection pools instead of the connections inherited from the parent."""
+    _fork_apps.add(app)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_engines_in_child)
+
+def pinned_to_primary():
+    """True while this client's read-your-writes window sends its reads to the primary."""
+    until = request.cookies.get(PRIMARY_COOKIE, type=float)
+    return until is not None and until >= time.time()
+
+def _wants_replica():
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    return not pinned_to_primary()
+
+class RoutingSession(Session):
+    """Sends reads made while serving GET requests to the 'replica' bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _wants_replica():
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_flush(session, flush_context):
+    session.info[_WROTE] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _note_statement(orm_execute_state):
+    # Core INSERT/UPDATE/DELETE sent through the session skip the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _note_commit(session):
+    if session.info.pop(_WROTE, False):
+        committed_writes()
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop(_WROTE, None)
+
+def committed_writes():
+    """Record that this request committed writes, so its client reads from
+    the primary for a while. Called on commit; writes made on other threads
+    (invoice runs) must call it from the request themselves."""
+    if has_request_context():
+        g.committed_writes = True
+
+def init_read_your_writes(app):
+    if 'replica' not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+
+    @app.after_request
+    def pin_to_primary(response):
+        # Pinned by what the request committed, not its method: batch reads
+        # are POSTs, and a rejected write commits nothing
+        if g.get('committed_writes') and response.status_code < 400:
+            window = app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+            response.set_cookie(PRIMARY_COOKIE, str(time.time() + window),
+                                max_age=int(window) + 1, httponly=True)
+        return response
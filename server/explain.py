@@ -0,0 +1,76 @@
+from datetime import date
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from models import db
+
+# The hot queries behind the API and the index each one is expected to use
+INDEX_CHECKS = [
+    (
+        'payments for a tenant by date',
+        'SELECT id FROM payments WHERE tenant_id = :tenant_id ORDER BY payment_date',
+        {'tenant_id': 1},
+        'ix_payments_tenant_id_payment_date'
+    ),
+    (
+        'payment_count subquery',
+        'SELECT count(id) FROM payments WHERE tenant_id = :tenant_id',
+        {'tenant_id': 1},
+        'ix_payments_tenant_id_payment_date'
+    ),
+    (
+        'payments by status and date range',
+        'SELECT id FROM payments WHERE status = :status AND payment_date >= :start_date',
+        {'status': 'pending', 'start_date': date(2025, 1, 1)},
+        'ix_payments_status_payment_date'
+    ),
+    (
+        'payments keyset page',
+        'SELECT id FROM payments WHERE payment_date > :payment_date '
+        'ORDER BY payment_date, id LIMIT 10',
+        {'payment_date': date(2025, 1, 1)},
+        'ix_payments_payment_date_id'
+    ),
+    (
+        'tenants for a property',
+        'SELECT id FROM tenants WHERE property_id = :property_id',
+        {'property_id': 1},
+        'ix_tenants_property_id'
+    ),
+]
+
+
+def explain(connection, sql, params):
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+        return '\n'.join(row[-1] for row in rows)
+    rows = connection.execute(text('EXPLAIN ' + sql), params)
+    return '\n'.join(row[0] for row in rows)
+
+def check_indexes():
+    results = []
+    with db.engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            # Small tables are cheaper to scan sequentially; we want to know
+            # whether the planner *can* use the index, not whether it does
+            # on this particular dataset
+            connection.execute(text('SET LOCAL enable_seqscan = off'))
+        for name, sql, params, index in INDEX_CHECKS:
+            plan = explain(connection, sql, params)
+            results.append((name, index, index in plan, plan))
+        connection.rollback()
+    return results
+
+@click.command('check-indexes')
+@click.option('--verbose', is_flag=True, help='Print the full query plans.')
+@with_appcontext
+def check_indexes_command(verbose):
+    """Verify with EXPLAIN that the hot queries use their indexes."""
+    failed = 0
+    for name, index, used, plan in check_indexes():
+        click.echo(f'{"ok  " if used else "FAIL"} {name} ({index})')
+        if verbose or not used:
+            click.echo('    ' + plan.replace('\n', '\n    '))
+        failed += not used
+    if failed:
+        raise click.ClickException(f'{failed} queries are not using their indexes')
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+from flask import Response, stream_with_context
+from sqlalchemy import select
+from models import db, Property, Tenant
+from payment_archive import payment_model
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+# Rows are fetched from a server-side cursor in batches of this size
+EXPORT_BATCH_SIZE = 1000
+
+
+def payments_export_query(start_date=None, end_date=None, status=None):
+    payment = payment_model(start_date, end_date)
+    stmt = (
+        select(
+            payment.id, payment.payment_type, payment.status, payment.amount,
+            payment.payment_date, payment.received_at, payment.tenant_id,
+            Tenant.name.label('tenant_name')
+        )
+        .join(Tenant, Tenant.id == payment.tenant_id)
+        .order_by(payment.id)
+        # Payment history outlives archived tenants, as in the payments list
+        .execution_options(include_archived=True)
+    )
+    if start_date:
+        stmt = stmt.where(payment.payment_date >= start_date)
+    if end_date:
+        stmt = stmt.where(payment.payment_date <= end_date)
+    if status:
+        stmt = stmt.where(payment.status == status)
+    return stmt
+
+def tenants_export_query(start_date=None, end_date=None):
+    stmt = (
+        select(
+            Tenant.id, Tenant.name, Tenant.phone, Tenant.email, Tenant.unit_id,
+            Tenant.property_id, Property.name.label('property_name'),
+            Tenant.created_at, Tenant.updated_at
+        )
+        .join(Property, Property.id == Tenant.property_id)
+        .order_by(Tenant.id)
+    )
+    # Tenants have no status; the date range applies to created_at
+    if start_date:
+        stmt = stmt.where(Tenant.created_at >= start_date)
+    if end_date:
+        stmt = stmt.where(Tenant.created_at < end_date + timedelta(days=1))
+    return stmt
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+def _csv_chunks(result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(result.keys())
+    yield buffer.getvalue()
+    for partition in result.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(v) for v in row] for row in partition)
+        yield buffer.getvalue()
+
+def _ndjson_chunks(result):
+    columns = list(result.keys())
+    for partition in result.partitions():
+        yield ''.join(
+            json.dumps(dict(zip(columns, map(_plain, row)))) + '\n'
+            for row in partition
+        )
+
+def export_response(stmt, fmt, name):
+    def generate():
+        result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        try:
+            chunks = _csv_chunks(result) if fmt == 'csv' else _ndjson_chunks(result)
+            yield from chunks
+        finally:
+            result.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={name}.{fmt}'}
+    )
@@ -0,0 +1,117 @@
+import operator
+from datetime import datetime
+from sqlalchemy import column, literal_column, or_, select, table, text
+from models import db, Tenant, TenantBalance
+from aggregates import BALANCE_TOLERANCE
+
+# Shortest ?q= a trigram index can serve
+MIN_SEARCH_LENGTH = 3
+
+# The expression the Postgres trigram index is built on; it has to match
+# the migration's index definition exactly for the planner to use it
+TENANT_SEARCH_TEXT = (
+    Tenant.name.concat(literal_column("' '")).concat(Tenant.email)
+    .concat(literal_column("' '")).concat(Tenant.phone)
+)
+
+TENANTS_SEARCH = table('tenants_search', column('rowid'))
+
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def _in_property(column, property_id):
+    return column.in_(select(Tenant.id).where(Tenant.property_id == property_id))
+
+def _flag(value):
+    if value.lower() in ('1', 'true'):
+        return True
+    if value.lower() in ('0', 'false'):
+        return False
+    raise ValueError(value)
+
+def _owing(column, owing):
+    # Served from tenant_balances through its pending_amount index
+    owes = column.in_(
+        select(TenantBalance.tenant_id).where(TenantBalance.pending_amount > BALANCE_TOLERANCE)
+    )
+    return owes if owing else ~owes
+
+def payment_filters(model):
+    # query parameter: (column, operator, parser); model is Payment or
+    # PaymentHistory, which share their columns
+    return {
+        'status': (model.status, operator.eq, str),
+        'payment_type': (model.payment_type, operator.eq, str),
+        'tenant_id': (model.tenant_id, operator.eq, int),
+        'property_id': (model.tenant_id, _in_property, int),
+        'start_date': (model.payment_date, operator.ge, _date),
+        'end_date': (model.payment_date, operator.le, _date),
+        'min_amount': (model.amount, operator.ge, float),
+        'max_amount': (model.amount, operator.le, float)
+    }
+
+TENANT_FILTERS = {
+    'property_id': (Tenant.property_id, operator.eq, int),
+    'unit_id': (Tenant.unit_id, operator.eq, str),
+    'owing': (Tenant.id, _owing, _flag)
+}
+
+PAYMENT_SORTS = ('payment_date', 'amount', 'received_at', 'id')
+TENANT_SORTS = ('id', 'name', 'created_at')
+
+
+def apply_filters(query, filters, args):
+    for param, (column, op, parse) in filters.items():
+        value = args.get(param)
+        if value is None or value == '':
+            continue
+        try:
+            value = parse(value)
+        except ValueError:
+            raise ValueError(f'Invalid {param}')
+        query = query.filter(op(column, value))
+    return query
+
+def parse_sort(model, value, allowed, default):
+    """Keyset columns and direction for ?sort=field or ?sort=-field.
+
+    Every sort ends on the primary key so the order, and therefore the
+    cursor, is total.
+    """
+    if not value:
+        return default, False
+    descending = value.startswith('-')
+    name = value.lstrip('-')
+    if name not in allowed:
+        raise ValueError(f'sort must be one of: {", ".join(allowed)}')
+    if name == 'id':
+        return (model.id,), descending
+    return (getattr(model, name), model.id), descending
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_tenants(query, q):
+    """Substring match of q on tenant name, email or phone."""
+    q = q.strip()
+    if len(q) < MIN_SEARCH_LENGTH:
+        raise ValueError(f'q must be at least {MIN_SEARCH_LENGTH} characters')
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        # FTS5 trigram table kept in sync by triggers; a quoted phrase is a
+        # case-insensitive substring match over all three columns
+        phrase = '"' + q.replace('"', '""') + '"'
+        matches = select(TENANTS_SEARCH.c.rowid).where(
+            text('tenants_search MATCH :q').bindparams(q=phrase)
+        )
+        return query.filter(Tenant.id.in_(matches))
+    pattern = f'%{_escape_like(q)}%'
+    if dialect == 'postgresql':
+        # Served by the pg_trgm GIN index on TENANT_SEARCH_TEXT
+        return query.filter(TENANT_SEARCH_TEXT.ilike(pattern, escape='\\'))
+    return query.filter(or_(
+        Tenant.name.ilike(pattern, escape='\\'),
+        Tenant.email.ilike(pattern, escape='\\'),
+        Tenant.phone.ilike(pattern, escape='\\')
+    ))
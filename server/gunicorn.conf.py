@@ -0,0 +1,42 @@
+"""gunicorn settings, sized from the CPU count and the database pool.
+
+    gunicorn -c gunicorn.conf.py
+
+Every worker has its own pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections,
+so DB_MAX_CONNECTIONS (the server's limit, minus headroom for migrations and
+consoles) caps the worker count. Each worker runs one thread per pooled
+connection, so a request never waits for a connection in the common case.
+"""
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_cpus = multiprocessing.cpu_count()
+_pool_size = int(os.environ.get('DB_POOL_SIZE', 5))
+_connections_per_worker = _pool_size + int(os.environ.get('DB_MAX_OVERFLOW', 10))
+
+wsgi_app = 'wsgi:app'
+bind = f'0.0.0.0:{os.environ.get("PORT", "8000")}'
+worker_class = 'gthread'
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * _cpus + 1))
+if os.environ.get('DB_MAX_CONNECTIONS'):
+    workers = max(1, min(workers, int(os.environ['DB_MAX_CONNECTIONS']) // _connections_per_worker))
+threads = int(os.environ.get('GUNICORN_THREADS', _pool_size))
+
+# Load the app once in the master and fork workers from it: they share its
+# memory copy-on-write and skip the imports. create_app() opens no
+# connections, and forked children get fresh pools (see database.py).
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Recycle workers now and then so a slow leak cannot grow without bound
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+
+def post_worker_init(worker):
+    # benchmarks/startup_bench.py waits for this line from every worker
+    worker.log.info('Worker ready (pid: %s)', worker.pid)
@@ -0,0 +1,126 @@
+from sqlalchemy import select
+from sqlalchemy.orm import aliased, selectinload
+from models import Property, Tenant, Payment
+
+# Nesting depth accepted in ?include=, e.g. tenants.payments is 2
+MAX_INCLUDE_DEPTH = 2
+
+# Largest ?limit[<include>]= accepted
+MAX_INCLUDE_LIMIT = 100
+
+# relationship name: (target model, foreign key on the target, order, default limit)
+# Order is by target column names, '-' for descending; limits keep the first
+# rows in that order. to-one relationships have no foreign key or order.
+# Names rather than attributes, since backrefs only exist once mappers configure.
+RELATIONSHIPS = {
+    Property: {
+        'tenants': (Tenant, 'property_id', ('id',), None)
+    },
+    Tenant: {
+        'payments': (Payment, 'tenant_id', ('-payment_date', '-id'), 10),
+        'property': (Property, None, None, None)
+    },
+    Payment: {
+        'tenant': (Tenant, None, None, None)
+    }
+}
+
+
+def _order_by(entity, order):
+    columns = []
+    for name in order:
+        column = getattr(entity, name.lstrip('-'))
+        columns.append(column.desc() if name.startswith('-') else column)
+    return columns
+
+def _sorted(rows, order):
+    # selectinload leaves collections unordered; stable sorts from the last
+    # key to the first give the mixed-direction order in Python
+    rows = list(rows)
+    for name in reversed(order):
+        rows.sort(key=lambda row: getattr(row, name.lstrip('-')), reverse=name.startswith('-'))
+    return rows
+
+class Includes:
+    """Relationships requested with ?include=, loaded with one selectinload
+    query per path and serialized nested under the parent.
+    """
+
+    def __init__(self, model, tree=None):
+        self.model = model
+        # name -> (limit, Includes for the target model)
+        self.tree = tree or {}
+
+    @classmethod
+    def parse(cls, model, args):
+        root = cls(model)
+        value = args.get('include')
+        if not value:
+            return root
+        for path in (part.strip() for part in value.split(',')):
+            if not path:
+                continue
+            names = path.split('.')
+            if len(names) > MAX_INCLUDE_DEPTH:
+                raise ValueError(f'include paths may be at most {MAX_INCLUDE_DEPTH} levels deep')
+            node = root
+            for depth, name in enumerate(names):
+                spec = RELATIONSHIPS.get(node.model, {}).get(name)
+                if spec is None:
+                    raise ValueError(f'Unknown include: {path}')
+                target, foreign_key, _, default_limit = spec
+                if name not in node.tree:
+                    limit = None
+                    if foreign_key is not None:
+                        limit = cls._limit(args, '.'.join(names[:depth + 1]), default_limit)
+                    node.tree[name] = (limit, cls(target))
+                node = node.tree[name][1]
+        return root
+
+    @staticmethod
+    def _limit(args, path, default):
+        value = args.get(f'limit[{path}]')
+        if value is None:
+            return default
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValueError(f'limit[{path}] must be an integer')
+        if not 1 <= limit <= MAX_INCLUDE_LIMIT:
+            raise ValueError(f'limit[{path}] must be between 1 and {MAX_INCLUDE_LIMIT}')
+        return limit
+
+    def options(self):
+        options = []
+        for name, (limit, child) in self.tree.items():
+            target, foreign_key, order, _ = RELATIONSHIPS[self.model][name]
+            relationship = getattr(self.model, name)
+            if limit is not None:
+                # Keep the first `limit` rows per parent: a correlated
+                # subquery served by the (foreign key, order) index
+                other = aliased(target)
+                first = (
+                    select(other.id)
+                    .where(getattr(other, foreign_key) == getattr(target, foreign_key))
+                    .correlate_except(other)
+                    .order_by(*_order_by(other, order))
+                    .limit(limit)
+                )
+                relationship = relationship.and_(target.id.in_(first))
+            if foreign_key is not None and hasattr(target, 'archived_at'):
+                # Archived children stay out whichever query loaded the parent
+                relationship = relationship.and_(target.archived_at.is_(None))
+            loader = selectinload(relationship).undefer_group('summary')
+            options.append(loader.options(*child.options()) if child.tree else loader)
+        return options
+
+    def serialize(self, obj):
+        data = obj.to_dict()
+        for name, (_, child) in self.tree.items():
+            _, foreign_key, order, _ = RELATIONSHIPS[self.model][name]
+            value = getattr(obj, name)
+            if foreign_key is None:
+                data[name] = child.serialize(value) if value is not None else None
+                continue
+            data[name] = [child.serialize(row) for row in _sorted(value, order)]
+        return data
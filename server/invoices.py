@@ -0,0 +1,162 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Date, DateTime, String, and_, exists, func, insert, literal, select
+from models import db, Property, Tenant, Payment
+from aggregates import record_payment_totals
+from changes import record_changes
+
+INVOICE_TYPE = 'Rent'
+INVOICE_STATUS = 'pending'
+
+# Properties handled per transaction
+DEFAULT_CHUNK_SIZE = 500
+
+# First key of the Postgres advisory lock held by a run; the second is the month
+INVOICE_LOCK_ID = 7130
+
+
+def next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+def _uninvoiced(month, property_ids):
+    # A tenant counts as invoiced once it has any rent payment dated in the
+    # month, which makes re-runs (and hand-entered rent) idempotent
+    already = exists().where(and_(
+        Payment.tenant_id == Tenant.id,
+        Payment.payment_type == INVOICE_TYPE,
+        Payment.payment_date >= month,
+        Payment.payment_date < next_month(month)
+    ))
+    # INSERT ... SELECT is not a plain SELECT, so archived tenants are
+    # excluded here rather than by the soft-delete hook
+    return and_(Tenant.property_id.in_(property_ids), Tenant.archived_at.is_(None), ~already)
+
+def _invoice_chunk(month, property_ids):
+    rows = (
+        select(
+            literal(INVOICE_TYPE, String), literal(INVOICE_STATUS, String), Property.rent,
+            literal(month, Date), literal(datetime.utcnow(), DateTime), Tenant.id
+        )
+        .join(Property, Property.id == Tenant.property_id)
+        .where(_uninvoiced(month, property_ids))
+    )
+    # The INSERT is the first statement of the transaction, so on SQLite it
+    # runs whole under the write lock
+    inserted = db.session.execute(
+        insert(Payment).from_select(
+            ['payment_type', 'status', 'amount', 'payment_date', 'received_at', 'tenant_id'],
+            rows
+        ).returning(Payment.id, Payment.tenant_id, Payment.amount)
+    ).all()
+    if not inserted:
+        return 0
+
+    # Summaries and balances from the rows actually written, in the same
+    # transaction; RETURNING only has payment columns, so the tenants'
+    # properties are read back from the rows the invoices reference
+    property_of = dict(db.session.execute(
+        select(Tenant.id, Tenant.property_id)
+        .where(Tenant.id.in_({tenant_id for _, tenant_id, _ in inserted}))
+        .execution_options(include_archived=True)
+    ).all())
+    record_payment_totals(
+        (property_of[tenant_id], tenant_id, month, INVOICE_STATUS, amount, 1)
+        for _, tenant_id, amount in inserted
+    )
+    record_changes(Payment, [payment_id for payment_id, _, _ in inserted])
+    return len(inserted)
+
+@contextmanager
+def _run_lock(month):
+    """Serialize runs for the same month.
+
+    NOT EXISTS alone does not stop two concurrent runs on Postgres from both
+    inserting rent for a tenant under READ COMMITTED; the second run waits
+    here and then finds nothing left to invoice. SQLite has a single writer
+    and each chunk's INSERT ... SELECT is atomic there.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+    key = month.year * 100 + month.month
+    # A session-level lock on a connection of its own, held across the
+    # chunk transactions
+    with db.engine.connect() as connection:
+        connection.execute(select(func.pg_advisory_lock(INVOICE_LOCK_ID, key)))
+        connection.commit()
+        try:
+            yield
+        finally:
+            connection.execute(select(func.pg_advisory_unlock(INVOICE_LOCK_ID, key)))
+            connection.commit()
+
+def generate_invoices(month, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Create the pending rent payment for every tenant that lacks one for month.
+
+    Properties are split into chunks, each invoiced with one INSERT ... SELECT
+    in its own transaction; chunks run on `workers` threads, at most as many
+    as the connection pool can spare.
+    """
+    app = current_app._get_current_object()
+    property_ids = db.session.scalars(select(Property.id).order_by(Property.id)).all()
+    db.session.commit()
+    chunks = [property_ids[i:i + chunk_size] for i in range(0, len(property_ids), chunk_size)]
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite allows a single writer; threads would only wait on the lock
+        workers = 1
+    else:
+        # Each worker holds a pooled connection for its chunk, and the run
+        # lock one more; keep one free for the rest of the app
+        pool_limit = app.config.get('DB_POOL_SIZE', 5) + app.config.get('DB_MAX_OVERFLOW', 10)
+        workers = min(workers, pool_limit - 2)
+
+    def run(chunk):
+        with app.app_context():
+            try:
+                created = _invoice_chunk(month, chunk)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        return len(chunk), created
+
+    totals = {
+        'month': month.strftime('%Y-%m'),
+        'chunks': len(chunks),
+        'properties': 0,
+        'invoices_created': 0
+    }
+    started = time.perf_counter()
+    with _run_lock(month), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for properties, created in pool.map(run, chunks):
+            totals['properties'] += properties
+            totals['invoices_created'] += created
+            if progress:
+                progress(totals)
+    totals['seconds'] = round(time.perf_counter() - started, 3)
+    return totals
+
+@click.command('generate-invoices')
+@click.option('--month', required=True, help='Month to invoice (YYYY-MM).')
+@click.option('--workers', default=4, show_default=True, help='Parallel transactions.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Properties per transaction.')
+@with_appcontext
+def generate_invoices_command(month, workers, chunk_size):
+    """Create pending rent payments for every tenant for a month."""
+    try:
+        month = datetime.strptime(month, '%Y-%m').date()
+    except ValueError:
+        raise click.BadParameter('Use YYYY-MM', param_hint='--month')
+
+    def progress(totals):
+        click.echo(f'{totals["properties"]} properties, {totals["invoices_created"]} invoices created')
+
+    totals = generate_invoices(month, workers, chunk_size, progress)
+    click.echo(f'Done in {totals["seconds"]}s: {totals["invoices_created"]} invoices '
+               f'for {totals["month"]}.')
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import defaultdict
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Statements kept per request for the slow-request log
+MAX_LOGGED_STATEMENTS = 50
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.responses = defaultdict(int)
+
+class Metrics:
+    """Per-route request and SQL instrumentation in Prometheus text format.
+
+    Request hooks time each request; engine-wide cursor events count the
+    statements it runs and the time spent in them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(RouteMetrics)
+        self._collectors = []
+        self.slow_request_seconds = 0.0
+        self.statement_header = False
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_MS', 0)
+        app.config.setdefault('SQL_STATEMENT_HEADER', False)
+        self.slow_request_seconds = app.config['SLOW_REQUEST_MS'] / 1000.0
+        # Reports the statement count per response, for the benchmark harness
+        self.statement_header = app.config['SQL_STATEMENT_HEADER']
+        self.logger = app.logger
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        app.extensions['metrics'] = self
+
+    def add_collector(self, collector):
+        # collector() returns [(name, type, help, [(labels, value), ...]), ...]
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+        g.sql_statements = [] if self.slow_request_seconds else None
+
+    def _after_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        size = None if response.is_streamed else response.calculate_content_length()
+        with self._lock:
+            metrics = self._routes[(request.method, route)]
+            metrics.latency.observe(elapsed)
+            metrics.statements.observe(g.sql_count)
+            metrics.db_time.observe(g.sql_time)
+            if size is not None:
+                metrics.response_size.observe(size)
+            metrics.responses[response.status_code] += 1
+        if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+            self._log_slow_request(route, elapsed)
+        if self.statement_header:
+            response.headers['X-SQL-Statements'] = str(g.sql_count)
+        return response
+
+    def _log_slow_request(self, route, elapsed):
+        lines = [
+            f'Slow request {request.method} {request.full_path} ({route}): '
+            f'{elapsed * 1000:.1f} ms, {g.sql_count} statements, {g.sql_time * 1000:.1f} ms in DB'
+        ]
+        for duration, statement in g.sql_statements:
+            lines.append(f'  {duration * 1000:8.1f} ms  {statement}')
+        if g.sql_count > len(g.sql_statements):
+            lines.append(f'  ... {g.sql_count - len(g.sql_statements)} more')
+        self.logger.warning('\n'.join(lines))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            routes = sorted(self._routes.items())
+            families = [
+                ('http_request_duration_seconds', 'Request latency', 'latency'),
+                ('http_request_sql_statements', 'SQL statements per request', 'statements'),
+                ('http_request_sql_duration_seconds', 'Time spent in SQL per request', 'db_time'),
+                ('http_response_size_bytes', 'Response body size', 'response_size'),
+            ]
+            for name, help_text, attribute in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (method, route), metrics in routes:
+                    labels = f'method="{method}",route="{route}"'
+                    lines.extend(getattr(metrics, attribute).samples(name, labels))
+            lines.append('# HELP http_responses_total Responses by status code')
+            lines.append('# TYPE http_responses_total counter')
+            for (method, route), metrics in routes:
+                for status, count in sorted(metrics.responses.items()):
+                    lines.append(
+                        f'http_responses_total{{method="{method}",route="{route}",'
+                        f'status="{status}"}} {count}'
+                    )
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def response(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+metrics = Metrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if not has_request_context() or 'sql_count' not in g:
+        return
+    g.sql_count += 1
+    g.sql_time += elapsed
+    statements = g.sql_statements
+    if statements is not None and len(statements) < MAX_LOGGED_STATEMENTS:
+        statements.append((elapsed, ' '.join(statement.split())))
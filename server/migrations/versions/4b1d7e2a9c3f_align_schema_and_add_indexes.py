@@ -0,0 +1,135 @@
+"""align schema with models and add indexes
+
+Revision ID: 4b1d7e2a9c3f
+Revises: c0e07d45b8a9
+Create Date: 2026-10-17 09:12:40.118342
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1d7e2a9c3f'
+down_revision = 'c0e07d45b8a9'
+branch_labels = None
+depends_on = None
+
+# Duplicate emails listed in the error before the rest are summarized
+MAX_LISTED_DUPLICATES = 20
+
+
+def _check_unique_emails():
+    # uq_tenants_email was never enforced before this revision; stop before
+    # anything changes rather than fail halfway through the table rebuild
+    if context.is_offline_mode():
+        return
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT email, COUNT(*) FROM tenants GROUP BY email HAVING COUNT(*) > 1 ORDER BY email'
+    )).all()
+    if not duplicates:
+        return
+    listed = ', '.join(f'{email} ({count} tenants)' for email, count in duplicates[:MAX_LISTED_DUPLICATES])
+    if len(duplicates) > MAX_LISTED_DUPLICATES:
+        listed += f' and {len(duplicates) - MAX_LISTED_DUPLICATES} more'
+    raise RuntimeError(
+        f'Tenant emails must be unique before upgrading; duplicated: {listed}. '
+        'Give those tenants distinct emails and run the upgrade again.'
+    )
+
+
+def upgrade():
+    _check_unique_emails()
+
+    # SQLite stores dates and datetimes as text, and batch mode would CAST
+    # the existing values to a numeric affinity, so only retype elsewhere
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+
+    with op.batch_alter_table('properties') as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('tenants') as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.alter_column('phone',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=20),
+               existing_nullable=False)
+        batch_op.alter_column('unit_id',
+               existing_type=sa.Integer(),
+               type_=sa.String(length=50),
+               existing_nullable=False,
+               postgresql_using='unit_id::varchar')
+        batch_op.create_unique_constraint('uq_tenants_email', ['email'])
+        batch_op.create_index('ix_tenants_property_id', ['property_id'])
+
+    with op.batch_alter_table('payments') as batch_op:
+        batch_op.add_column(sa.Column('received_at', sa.DateTime(), nullable=True))
+        batch_op.alter_column('payment_type',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=50),
+               existing_nullable=False)
+        batch_op.alter_column('status',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=50),
+               existing_nullable=False)
+        if not is_sqlite:
+            batch_op.alter_column('payment_date',
+                   existing_type=sa.DateTime(),
+                   type_=sa.Date(),
+                   existing_nullable=False,
+                   postgresql_using='payment_date::date')
+        batch_op.create_index('ix_payments_tenant_id_payment_date', ['tenant_id', 'payment_date'])
+        batch_op.create_index('ix_payments_status_payment_date', ['status', 'payment_date'])
+        batch_op.create_index('ix_payments_payment_date_id', ['payment_date', 'id'])
+
+    # Rows created before these columns existed would break to_dict()
+    op.execute('UPDATE properties SET created_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    op.execute('UPDATE tenants SET created_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    op.execute('UPDATE payments SET received_at = CURRENT_TIMESTAMP WHERE received_at IS NULL')
+    if is_sqlite:
+        # Drop the time part so values compare correctly against plain dates
+        op.execute('UPDATE payments SET payment_date = date(payment_date)')
+
+
+def downgrade():
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+
+    with op.batch_alter_table('payments') as batch_op:
+        batch_op.drop_index('ix_payments_payment_date_id')
+        batch_op.drop_index('ix_payments_status_payment_date')
+        batch_op.drop_index('ix_payments_tenant_id_payment_date')
+        if not is_sqlite:
+            batch_op.alter_column('payment_date',
+                   existing_type=sa.Date(),
+                   type_=sa.DateTime(),
+                   existing_nullable=False)
+        batch_op.alter_column('status',
+               existing_type=sa.String(length=50),
+               type_=sa.String(length=100),
+               existing_nullable=False)
+        batch_op.alter_column('payment_type',
+               existing_type=sa.String(length=50),
+               type_=sa.String(length=100),
+               existing_nullable=False)
+        batch_op.drop_column('received_at')
+
+    with op.batch_alter_table('tenants') as batch_op:
+        batch_op.drop_index('ix_tenants_property_id')
+        batch_op.drop_constraint('uq_tenants_email', type_='unique')
+        batch_op.alter_column('unit_id',
+               existing_type=sa.String(length=50),
+               type_=sa.Integer(),
+               existing_nullable=False,
+               postgresql_using='unit_id::integer')
+        batch_op.alter_column('phone',
+               existing_type=sa.String(length=20),
+               type_=sa.String(length=100),
+               existing_nullable=False)
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
+
+    with op.batch_alter_table('properties') as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('created_at')
@@ -0,0 +1,94 @@
+"""cascade deletes in the database and add archived_at
+
+Revision ID: 5f7c2e9b4a10
+Revises: d3a9f61c7b28
+Create Date: 2026-10-17 16:40:21.774510
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f7c2e9b4a10'
+down_revision = 'd3a9f61c7b28'
+branch_labels = None
+depends_on = None
+
+
+# The original foreign keys were unnamed: Postgres named them
+# <table>_<column>_fkey, SQLite gets names from this convention in batch mode
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'
+}
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ('tenants', 'property_id', 'properties'),
+    ('payments', 'tenant_id', 'tenants'),
+    ('monthly_property_summary', 'property_id', 'properties'),
+]
+
+# Recreating tenants on SQLite drops the triggers behind tenants_search
+SQLITE_SEARCH_TRIGGERS = [
+    """CREATE TRIGGER tenants_search_insert AFTER INSERT ON tenants BEGIN
+        INSERT INTO tenants_search (rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END""",
+    """CREATE TRIGGER tenants_search_delete AFTER DELETE ON tenants BEGIN
+        INSERT INTO tenants_search (tenants_search, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+    END""",
+    """CREATE TRIGGER tenants_search_update AFTER UPDATE OF name, email, phone ON tenants BEGIN
+        INSERT INTO tenants_search (tenants_search, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+        INSERT INTO tenants_search (rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END""",
+]
+
+
+def _replace_foreign_keys(ondelete, old_names, new_names):
+    for table, column, referred in FOREIGN_KEYS:
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint(old_names(table, column, referred), type_='foreignkey')
+            batch_op.create_foreign_key(new_names(table, column, referred), referred,
+                                        [column], ['id'], ondelete=ondelete)
+
+
+def _convention_name(table, column, referred):
+    return NAMING_CONVENTION['fk'] % {
+        'table_name': table, 'column_0_name': column, 'referred_table_name': referred
+    }
+
+
+def _original_name(table, column, referred):
+    if op.get_bind().dialect.name == 'postgresql':
+        return f'{table}_{column}_fkey'
+    return _convention_name(table, column, referred)
+
+
+def upgrade():
+    with op.batch_alter_table('properties', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('tenants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+
+    _replace_foreign_keys('CASCADE', _original_name, _convention_name)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_SEARCH_TRIGGERS:
+            op.execute(statement)
+
+
+def downgrade():
+    _replace_foreign_keys(None, _convention_name, _original_name)
+
+    with op.batch_alter_table('tenants', schema=None) as batch_op:
+        batch_op.drop_column('archived_at')
+    with op.batch_alter_table('properties', schema=None) as batch_op:
+        batch_op.drop_column('archived_at')
+
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_SEARCH_TRIGGERS:
+            op.execute(statement)
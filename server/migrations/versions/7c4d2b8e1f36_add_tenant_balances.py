@@ -0,0 +1,53 @@
+"""add tenant balances
+
+Revision ID: 7c4d2b8e1f36
+Revises: a61e0b3d9c54
+Create Date: 2026-10-17 19:12:08.315664
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4d2b8e1f36'
+down_revision = 'a61e0b3d9c54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tenant_balances',
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.Column('paid_amount', sa.Float(), nullable=False),
+    sa.Column('pending_amount', sa.Float(), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'],
+                            name='fk_tenant_balances_tenant_id_tenants', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tenant_id')
+    )
+    with op.batch_alter_table('tenant_balances', schema=None) as batch_op:
+        batch_op.create_index('ix_tenant_balances_pending_amount', ['pending_amount'], unique=False)
+
+    # Backfill from hot and archived payments; same result as
+    # `flask verify-balances --fix`
+    op.execute('''
+        INSERT INTO tenant_balances (tenant_id, paid_amount, pending_amount, payment_count)
+        SELECT tenant_id,
+            SUM(CASE WHEN lower(status) = 'paid' THEN amount ELSE 0 END),
+            SUM(CASE WHEN lower(status) = 'pending' THEN amount ELSE 0 END),
+            COUNT(id)
+        FROM (
+            SELECT id, tenant_id, status, amount FROM payments
+            UNION ALL
+            SELECT id, tenant_id, status, amount FROM payments_archive
+        ) AS payment_history
+        GROUP BY tenant_id
+    ''')
+
+
+def downgrade():
+    with op.batch_alter_table('tenant_balances', schema=None) as batch_op:
+        batch_op.drop_index('ix_tenant_balances_pending_amount')
+
+    op.drop_table('tenant_balances')
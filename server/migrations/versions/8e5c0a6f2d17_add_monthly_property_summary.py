@@ -0,0 +1,48 @@
+"""add monthly property summary
+
+Revision ID: 8e5c0a6f2d17
+Revises: 4b1d7e2a9c3f
+Create Date: 2026-10-17 11:03:27.540915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e5c0a6f2d17'
+down_revision = '4b1d7e2a9c3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('monthly_property_summary',
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('paid_amount', sa.Float(), nullable=False),
+    sa.Column('pending_amount', sa.Float(), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['property_id'], ['properties.id'], ),
+    sa.PrimaryKeyConstraint('property_id', 'month')
+    )
+
+    # Backfill from existing payments; same result as `flask rebuild-summaries`
+    if op.get_bind().dialect.name == 'sqlite':
+        month = "date(payments.payment_date, 'start of month')"
+    else:
+        month = "CAST(date_trunc('month', payments.payment_date) AS date)"
+    op.execute(f'''
+        INSERT INTO monthly_property_summary
+            (property_id, month, paid_amount, pending_amount, payment_count)
+        SELECT tenants.property_id, {month},
+            SUM(CASE WHEN lower(payments.status) = 'paid' THEN payments.amount ELSE 0 END),
+            SUM(CASE WHEN lower(payments.status) = 'pending' THEN payments.amount ELSE 0 END),
+            COUNT(payments.id)
+        FROM payments JOIN tenants ON tenants.id = payments.tenant_id
+        GROUP BY tenants.property_id, {month}
+    ''')
+
+
+def downgrade():
+    op.drop_table('monthly_property_summary')
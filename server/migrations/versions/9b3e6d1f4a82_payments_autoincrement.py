@@ -0,0 +1,45 @@
+"""never reuse payment ids on SQLite
+
+Revision ID: 9b3e6d1f4a82
+Revises: 2e8f5a1c9d47
+Create Date: 2026-10-18 09:12:05.331870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e6d1f4a82'
+down_revision = '2e8f5a1c9d47'
+branch_labels = None
+depends_on = None
+
+
+# Without AUTOINCREMENT SQLite hands out max(id) + 1, which can be the id of
+# a payment that has since moved to payments_archive. Postgres sequences
+# never go backwards, so only SQLite needs the table rebuilt.
+
+def _rebuild_payments(autoincrement):
+    with op.batch_alter_table('payments', recreate='always',
+                              table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild_payments(True)
+    # Start after every id used so far, archived ones included
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'payments'")
+    op.execute(
+        "INSERT INTO sqlite_sequence (name, seq) "
+        "SELECT 'payments', coalesce(max(id), 0) FROM "
+        "(SELECT id FROM payments UNION ALL SELECT id FROM payments_archive)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _rebuild_payments(False)
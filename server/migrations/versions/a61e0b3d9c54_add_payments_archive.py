@@ -0,0 +1,48 @@
+"""add payments archive
+
+Revision ID: a61e0b3d9c54
+Revises: 5f7c2e9b4a10
+Create Date: 2026-10-17 18:05:46.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a61e0b3d9c54'
+down_revision = '5f7c2e9b4a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payments_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('payment_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('payment_date', sa.Date(), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.Column('tenant_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'],
+                            name='fk_payments_archive_tenant_id_tenants', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('payments_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_archive_tenant_id_payment_date', ['tenant_id', 'payment_date'], unique=False)
+        batch_op.create_index('ix_payments_archive_payment_date_id', ['payment_date', 'id'], unique=False)
+
+
+def downgrade():
+    # Archived payments go back to the hot table first
+    op.execute(
+        'INSERT INTO payments (id, payment_type, status, amount, payment_date, received_at, tenant_id) '
+        'SELECT id, payment_type, status, amount, payment_date, received_at, tenant_id '
+        'FROM payments_archive'
+    )
+    with op.batch_alter_table('payments_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_archive_payment_date_id')
+        batch_op.drop_index('ix_payments_archive_tenant_id_payment_date')
+
+    op.drop_table('payments_archive')
@@ -0,0 +1,74 @@
+"""add tenant search index
+
+Revision ID: d3a9f61c7b28
+Revises: 8e5c0a6f2d17
+Create Date: 2026-10-17 14:12:05.318402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a9f61c7b28'
+down_revision = '8e5c0a6f2d17'
+branch_labels = None
+depends_on = None
+
+
+# SQLite: an external-content FTS5 table over tenants with the trigram
+# tokenizer (SQLite 3.34+), kept in sync by triggers
+SQLITE_UPGRADE = [
+    """CREATE VIRTUAL TABLE tenants_search USING fts5(
+        name, email, phone, content='tenants', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER tenants_search_insert AFTER INSERT ON tenants BEGIN
+        INSERT INTO tenants_search (rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END""",
+    """CREATE TRIGGER tenants_search_delete AFTER DELETE ON tenants BEGIN
+        INSERT INTO tenants_search (tenants_search, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+    END""",
+    """CREATE TRIGGER tenants_search_update AFTER UPDATE OF name, email, phone ON tenants BEGIN
+        INSERT INTO tenants_search (tenants_search, rowid, name, email, phone)
+        VALUES ('delete', old.id, old.name, old.email, old.phone);
+        INSERT INTO tenants_search (rowid, name, email, phone)
+        VALUES (new.id, new.name, new.email, new.phone);
+    END""",
+    "INSERT INTO tenants_search (tenants_search) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    'DROP TRIGGER IF EXISTS tenants_search_update',
+    'DROP TRIGGER IF EXISTS tenants_search_delete',
+    'DROP TRIGGER IF EXISTS tenants_search_insert',
+    'DROP TABLE IF EXISTS tenants_search',
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        # Must match filters.TENANT_SEARCH_TEXT
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute(
+            "CREATE INDEX ix_tenants_search_trgm ON tenants USING gin "
+            "((name || ' ' || email || ' ' || phone) gin_trgm_ops)"
+        )
+    with op.batch_alter_table('tenants', schema=None) as batch_op:
+        batch_op.create_index('ix_tenants_unit_id', ['unit_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('tenants', schema=None) as batch_op:
+        batch_op.drop_index('ix_tenants_unit_id')
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_tenants_search_trgm')
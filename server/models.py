@@ -1,13 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import column_property
 from datetime import datetime
+from database import RoutingSession
+from serializers import Serializer
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class BaseModel(db.Model):
     __abstract__ = True
     
-    def to_dict(self):
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+    serializer = None
+    
+    def to_dict(self, fields=None):
+        return self.serializer(self, fields)
 
 class Property(BaseModel):
     __tablename__ = 'properties'
@@ -19,41 +25,43 @@ class Property(BaseModel):
     rent = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    archived_at = db.Column(db.DateTime, nullable=True)
     
-    tenants = db.relationship('Tenant', backref='property', lazy=True, cascade='all, delete-orphan')
-    
-    def to_dict(self):
-        data = super().to_dict()
-        data['created_at'] = self.created_at.isoformat()
-        data['updated_at'] = self.updated_at.isoformat()
-        data['tenant_count'] = len(self.tenants)
-        return data
+    # The database cascades deletes (ON DELETE CASCADE), so the ORM does not
+    # load the children just to delete them
+    tenants = db.relationship('Tenant', backref='property', lazy=True,
+                              cascade='all, delete-orphan', passive_deletes=True)
 
 class Tenant(BaseModel):
     __tablename__ = 'tenants'
+    __table_args__ = (
+        db.UniqueConstraint('email', name='uq_tenants_email'),
+        db.Index('ix_tenants_property_id', 'property_id'),
+        db.Index('ix_tenants_unit_id', 'unit_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
-    email = db.Column(db.String(100), nullable=False, unique=True)
+    email = db.Column(db.String(100), nullable=False)
     unit_id = db.Column(db.String(50), nullable=False)
-    property_id = db.Column(db.Integer, db.ForeignKey('properties.id'), nullable=False)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    archived_at = db.Column(db.DateTime, nullable=True)
     
-    payments = db.relationship('Payment', backref='tenant', lazy=True, cascade='all, delete-orphan')
-    
-    def to_dict(self):
-        data = super().to_dict()
-        data['created_at'] = self.created_at.isoformat()
-        data['updated_at'] = self.updated_at.isoformat()
-        data['payment_count'] = len(self.payments)
-        if self.property:
-            data['property_name'] = self.property.name
-        return data
+    payments = db.relationship('Payment', backref='tenant', lazy=True,
+                               cascade='all, delete-orphan', passive_deletes=True)
 
 class Payment(BaseModel):
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_tenant_id_payment_date', 'tenant_id', 'payment_date'),
+        db.Index('ix_payments_status_payment_date', 'status', 'payment_date'),
+        db.Index('ix_payments_payment_date_id', 'payment_date', 'id'),
+        # Archived payments keep their id, so a freed id must never be handed out again
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     payment_type = db.Column(db.String(50), nullable=False)
@@ -61,12 +69,127 @@ class Payment(BaseModel):
     amount = db.Column(db.Float, nullable=False)
     payment_date = db.Column(db.Date, nullable=False)
     received_at = db.Column(db.DateTime, default=datetime.utcnow)
-    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'), nullable=False)
+
+class PaymentArchive(db.Model):
+    """Payments older than the hot horizon, moved here by `flask archive-payments`."""
+    __tablename__ = 'payments_archive'
+    __table_args__ = (
+        db.Index('ix_payments_archive_tenant_id_payment_date', 'tenant_id', 'payment_date'),
+        db.Index('ix_payments_archive_payment_date_id', 'payment_date', 'id'),
+    )
+    
+    # Keeps the id the payment had in the hot table
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    payment_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    received_at = db.Column(db.DateTime)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'), nullable=False)
+
+PAYMENT_COLUMNS = ('id', 'payment_type', 'status', 'amount', 'payment_date', 'received_at', 'tenant_id')
+
+# Hot and archived payments as one read-only entity, for reads whose date
+# range reaches back past the archive horizon
+payment_history = union_all(
+    select(*(Payment.__table__.c[name] for name in PAYMENT_COLUMNS)),
+    select(*(PaymentArchive.__table__.c[name] for name in PAYMENT_COLUMNS))
+).subquery('payment_history')
+
+class PaymentHistory(BaseModel):
+    __table__ = payment_history
+
+class MonthlyPropertySummary(db.Model):
+    __tablename__ = 'monthly_property_summary'
+    
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'),
+                            primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    paid_amount = db.Column(db.Float, nullable=False, default=0)
+    pending_amount = db.Column(db.Float, nullable=False, default=0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+
+class TenantBalance(db.Model):
+    """Running payment totals per tenant, hot and archived payments alike."""
+    __tablename__ = 'tenant_balances'
+    __table_args__ = (
+        db.Index('ix_tenant_balances_pending_amount', 'pending_amount'),
+    )
     
-    def to_dict(self):
-        data = super().to_dict()
-        data['payment_date'] = self.payment_date.isoformat()
-        data['received_at'] = self.received_at.isoformat()
-        if self.tenant:
-            data['tenant_name'] = self.tenant.name
-        return data
\ No newline at end of file
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id', ondelete='CASCADE'),
+                          primary_key=True)
+    paid_amount = db.Column(db.Float, nullable=False, default=0)
+    pending_amount = db.Column(db.Float, nullable=False, default=0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    """One row per created, updated or deleted property, tenant or payment,
+    in commit order; read by GET /api/changes."""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_changed_at', 'changed_at'),
+        # Sequence numbers are never reused, even after pruning
+        {'sqlite_autoincrement': True},
+    )
+    
+    seq = db.Column(db.BigInteger().with_variant(db.Integer(), 'sqlite'), primary_key=True)
+    resource = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Counts and joined names computed in SQL as correlated subqueries. They are
+# deferred into the 'summary' group so that list and detail handlers can load
+# them with undefer_group('summary') in the same query as the rows themselves.
+Property.tenant_count = column_property(
+    select(func.count(Tenant.id))
+    .where(Tenant.property_id == Property.id, Tenant.archived_at.is_(None))
+    .correlate_except(Tenant)
+    .scalar_subquery(),
+    deferred=True, group='summary'
+)
+
+Tenant.payment_count = column_property(
+    select(func.count(Payment.id))
+    .where(Payment.tenant_id == Tenant.id)
+    .correlate_except(Payment)
+    .scalar_subquery()
+    + select(func.count(PaymentArchive.id))
+    .where(PaymentArchive.tenant_id == Tenant.id)
+    .correlate_except(PaymentArchive)
+    .scalar_subquery(),
+    deferred=True, group='summary'
+)
+
+Tenant.property_name = column_property(
+    select(Property.name)
+    .where(Property.id == Tenant.property_id)
+    .correlate_except(Property)
+    .scalar_subquery(),
+    deferred=True, group='summary'
+)
+
+Payment.tenant_name = column_property(
+    select(Tenant.name)
+    .where(Tenant.id == Payment.tenant_id)
+    .correlate_except(Tenant)
+    .scalar_subquery(),
+    deferred=True, group='summary'
+)
+
+PaymentHistory.tenant_name = column_property(
+    select(Tenant.name)
+    .where(Tenant.id == PaymentHistory.tenant_id)
+    .correlate_except(Tenant)
+    .scalar_subquery(),
+    deferred=True, group='summary'
+)
+
+# Serializers are generated once here, after every mapped attribute exists.
+# archived_at is left out: archived rows are never served.
+Property.serializer = Serializer(Property, extra=['tenant_count'], exclude=['archived_at'])
+Tenant.serializer = Serializer(Tenant, extra=['payment_count', 'property_name'],
+                               optional=['property_name'], exclude=['archived_at'])
+Payment.serializer = Serializer(Payment, extra=['tenant_name'], optional=['tenant_name'])
+PaymentHistory.serializer = Serializer(PaymentHistory, extra=['tenant_name'], optional=['tenant_name'])
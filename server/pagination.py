@@ -0,0 +1,57 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        decoded = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is float and isinstance(value, int):
+                value = float(value)
+            elif not isinstance(value, python_type):
+                raise ValueError
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def keyset_filter(columns, values, descending=False):
+    # Row-value comparison (a, b) > (x, y) spelled out as
+    # a > x OR (a = x AND b > y) so it works on every backend
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [c == v for c, v in zip(columns[:i], values[:i])]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
+
+def keyset_order(columns, descending=False):
+    return [column.desc() for column in columns] if descending else list(columns)
+
+def keyset_paginate(query, columns, limit, cursor=None, descending=False):
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(keyset_filter(columns, values, descending))
+    # Fetch one extra row to learn whether another page exists
+    items = query.order_by(*keyset_order(columns, descending)).limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return items, next_cursor
@@ -0,0 +1,86 @@
+import time
+from datetime import date
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, select
+from models import db, Payment, PaymentArchive, PaymentHistory, PAYMENT_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def hot_horizon(months):
+    """First day of the oldest month kept in the hot payments table."""
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+def archived_until():
+    # Latest archived payment date; one lookup on the (payment_date, id) index
+    return db.session.scalar(select(func.max(PaymentArchive.payment_date)))
+
+def payment_model(start_date, end_date=None):
+    """Payment for reads that stay in the hot table, PaymentHistory for
+    reads whose date range reaches into the archive.
+
+    A range with only an end date is open below, so it reaches the archive
+    too; with no dates at all the read stays in the hot table.
+    """
+    if start_date is None and end_date is None:
+        return Payment
+    until = archived_until()
+    if until is None:
+        return Payment
+    return PaymentHistory if start_date is None or start_date <= until else Payment
+
+def archive_payments(before, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Move payments dated before `before` into payments_archive.
+
+    Each chunk is copied and deleted in its own transaction, walking the
+    (payment_date, id) index, so the job can stop and resume at any point.
+    Summaries already count every payment wherever it lives.
+    """
+    hot = [Payment.__table__.c[name] for name in PAYMENT_COLUMNS]
+    moved = 0
+    while True:
+        ids = db.session.scalars(
+            select(Payment.id)
+            .where(Payment.payment_date < before)
+            .order_by(Payment.payment_date, Payment.id)
+            .limit(chunk_size)
+        ).all()
+        if not ids:
+            break
+        db.session.execute(
+            insert(PaymentArchive).from_select(PAYMENT_COLUMNS, select(*hot).where(Payment.id.in_(ids)))
+        )
+        db.session.execute(
+            delete(Payment).where(Payment.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        moved += len(ids)
+        if progress:
+            progress(moved)
+    return moved
+
+@click.command('archive-payments')
+@click.option('--months', default=None, type=int,
+              help='Months kept in the hot table (default: PAYMENT_HOT_MONTHS).')
+@click.option('--before', default=None, help='Archive payments dated before YYYY-MM-DD instead.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Payments moved per transaction.')
+@with_appcontext
+def archive_payments_command(months, before, chunk_size):
+    """Move old payments into payments_archive."""
+    if before:
+        try:
+            before = date.fromisoformat(before)
+        except ValueError:
+            raise click.BadParameter('Use YYYY-MM-DD', param_hint='--before')
+    else:
+        before = hot_horizon(months if months is not None else current_app.config['PAYMENT_HOT_MONTHS'])
+    started = time.perf_counter()
+    moved = archive_payments(before, chunk_size,
+                             lambda moved: click.echo(f'\r{moved} payments archived', nl=False))
+    click.echo(f'\nArchived {moved} payments dated before {before.isoformat()} '
+               f'in {time.perf_counter() - started:.1f}s.')
@@ -0,0 +1,195 @@
+import csv
+import io
+import math
+import time
+from collections import defaultdict
+from datetime import date, datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, select, update
+from models import db, Tenant, Payment
+from aggregates import record_payments
+from changes import record_changes
+
+# Statement columns; reference is optional and only echoed back
+STATEMENT_COLUMNS = ('tenant_id', 'amount', 'date')
+
+PAID = 'paid'
+PENDING = 'pending'
+
+# Days a statement line may be away from the payment date and still match
+DEFAULT_WINDOW_DAYS = 5
+
+# Matched payments marked paid per transaction
+DEFAULT_CHUNK_SIZE = 5000
+
+# Unmatched lines returned in the response; the count covers all of them
+DEFAULT_UNMATCHED_LIMIT = 1000
+
+
+def _cents(amount):
+    return round(amount * 100)
+
+def build_index():
+    """(tenant_id, amount in cents) -> [(payment_date, id, property_id, amount), ...]
+    for every pending payment, from one query.
+
+    Memory grows with the number of pending payments, not with the size of
+    the statement.
+    """
+    index = defaultdict(list)
+    rows = db.session.execute(
+        select(Payment.tenant_id, Payment.amount, Payment.payment_date, Payment.id, Tenant.property_id)
+        .join(Tenant, Tenant.id == Payment.tenant_id)
+        .where(Payment.status == PENDING)
+        # A tenant who has moved out can still settle arrears
+        .execution_options(include_archived=True, yield_per=10000)
+    )
+    for tenant_id, amount, payment_date, id, property_id in rows:
+        index[(tenant_id, _cents(amount))].append((payment_date, id, property_id, amount))
+    return index
+
+def _take(candidates, day, window):
+    # Closest payment date within the window; the list is short, usually one
+    best = None
+    for position, candidate in enumerate(candidates):
+        distance = abs((candidate[0] - day).days)
+        if distance <= window and (best is None or distance < best[0]):
+            best = (distance, position)
+    if best is None:
+        return None
+    return candidates.pop(best[1])
+
+def _parse(row, columns):
+    # (tenant_id, amount in cents, date), or None for a line that cannot match
+    try:
+        amount = float(row[columns['amount']])
+        if not math.isfinite(amount):
+            return None
+        return (
+            int(row[columns['tenant_id']]),
+            _cents(amount),
+            date.fromisoformat(row[columns['date']].strip())
+        )
+    except (IndexError, ValueError):
+        return None
+
+def _settle(matches):
+    """Mark matched payments paid in one transaction.
+
+    Only rows still pending are updated, so a payment settled elsewhere since
+    the index was built is not counted twice.
+    """
+    if not matches:
+        return 0
+    updated = set(db.session.scalars(
+        update(Payment)
+        .where(Payment.id.in_(list(matches)), Payment.status == PENDING)
+        .values(status=PAID)
+        .returning(Payment.id)
+        .execution_options(synchronize_session=False)
+    ))
+    if updated:
+        db.session.execute(
+            update(Payment.__table__)
+            .where(Payment.__table__.c.id == bindparam('payment_id'))
+            .values(received_at=bindparam('received_at')),
+            [{'payment_id': id, 'received_at': matches[id][4]} for id in updated]
+        )
+        rows = [matches[id][:4] for id in updated]
+        record_payments(
+            added=[(pid, tid, day, PAID, amount) for pid, tid, day, amount in rows],
+            removed=[(pid, tid, day, PENDING, amount) for pid, tid, day, amount in rows]
+        )
+        record_changes(Payment, updated)
+    db.session.commit()
+    return len(updated)
+
+def reconcile(lines, window=DEFAULT_WINDOW_DAYS, chunk_size=DEFAULT_CHUNK_SIZE,
+              unmatched_limit=DEFAULT_UNMATCHED_LIMIT, on_unmatched=None):
+    """Match statement lines (an iterable of CSV text lines) to pending payments.
+
+    Each line settles at most one payment with the same tenant and amount,
+    dated within `window` days; matches are marked paid `chunk_size` at a
+    time. The first `unmatched_limit` unmatched lines are returned and every
+    one is passed to on_unmatched(line_number, row, reason).
+    """
+    started = time.perf_counter()
+    index = build_index()
+    reader = csv.reader(lines)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [name for name in STATEMENT_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f'Statement is missing columns: {", ".join(missing)}')
+    columns = {name: header.index(name) for name in header}
+
+    totals = {'lines': 0, 'matched': 0, 'already_settled': 0, 'unmatched': 0, 'invalid': 0}
+    unmatched = []
+    matches = {}
+
+    def reject(line_number, row, reason):
+        totals['invalid' if reason == 'invalid' else 'unmatched'] += 1
+        if len(unmatched) < unmatched_limit:
+            unmatched.append({'line': line_number, 'row': row, 'reason': reason})
+        if on_unmatched:
+            on_unmatched(line_number, row, reason)
+
+    for line_number, row in enumerate(reader, start=2):
+        if not row:
+            continue
+        totals['lines'] += 1
+        parsed = _parse(row, columns)
+        if parsed is None:
+            reject(line_number, row, 'invalid')
+            continue
+        tenant_id, cents, day = parsed
+        candidates = index.get((tenant_id, cents))
+        payment = _take(candidates, day, window) if candidates else None
+        if payment is None:
+            reject(line_number, row, 'no pending payment')
+            continue
+        payment_date, id, property_id, amount = payment
+        matches[id] = (property_id, tenant_id, payment_date, amount,
+                       datetime.combine(day, datetime.min.time()))
+        if len(matches) >= chunk_size:
+            settled = _settle(matches)
+            totals['matched'] += settled
+            totals['already_settled'] += len(matches) - settled
+            matches = {}
+    settled = _settle(matches)
+    totals['matched'] += settled
+    totals['already_settled'] += len(matches) - settled
+    totals['seconds'] = round(time.perf_counter() - started, 3)
+    return totals, unmatched
+
+def statement_lines(stream):
+    # Decodes a binary request body line by line; a BOM from spreadsheet
+    # exports is dropped
+    return io.TextIOWrapper(io.BufferedReader(stream), encoding='utf-8-sig', newline='')
+
+@click.command('reconcile')
+@click.argument('statement', type=click.Path(exists=True, dir_okay=False))
+@click.option('--window', default=DEFAULT_WINDOW_DAYS, show_default=True,
+              help='Days between payment date and statement date that still match.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help='Payments marked paid per transaction.')
+@click.option('--unmatched', 'unmatched_path', type=click.Path(dir_okay=False),
+              help='Write every unmatched line here as CSV.')
+@with_appcontext
+def reconcile_command(statement, window, chunk_size, unmatched_path):
+    """Mark pending payments paid from a bank statement CSV (tenant_id,amount,date)."""
+    out = open(unmatched_path, 'w', newline='') if unmatched_path else None
+    try:
+        writer = csv.writer(out) if out else None
+        on_unmatched = (lambda line, row, reason: writer.writerow([line, reason, *row])) if writer else None
+        with open(statement, newline='', encoding='utf-8-sig') as lines:
+            try:
+                totals, _ = reconcile(lines, window, chunk_size, 0, on_unmatched)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+    finally:
+        if out:
+            out.close()
+    click.echo(f'{totals["lines"]} lines in {totals["seconds"]}s: {totals["matched"]} matched, '
+               f'{totals["unmatched"]} unmatched, {totals["invalid"]} invalid, '
+               f'{totals["already_settled"]} already settled')
@@ -0,0 +1,48 @@
+from sqlalchemy import and_, select
+from models import db, Property, MonthlyPropertySummary
+
+
+def _property_rows(month):
+    summary = MonthlyPropertySummary
+    stmt = (
+        select(
+            Property.id, Property.name, Property.rent, Property.tenant_count,
+            summary.paid_amount, summary.pending_amount, summary.payment_count
+        )
+        .outerjoin(summary, and_(summary.property_id == Property.id, summary.month == month))
+        .order_by(Property.id)
+    )
+    for property_id, name, rent, tenant_count, paid, pending, count in db.session.execute(stmt):
+        expected = rent * tenant_count
+        collected = paid or 0.0
+        yield {
+            'property_id': property_id,
+            'property_name': name,
+            'rent': rent,
+            'tenant_count': tenant_count,
+            'expected': expected,
+            'collected': collected,
+            'pending': pending or 0.0,
+            'payment_count': count or 0,
+            'outstanding': max(expected - collected, 0.0)
+        }
+
+def rent_roll(month):
+    rows = list(_property_rows(month))
+    return {
+        'month': month.strftime('%Y-%m'),
+        'properties': rows,
+        'totals': {
+            key: sum(row[key] for row in rows)
+            for key in ('expected', 'collected', 'pending', 'outstanding')
+        }
+    }
+
+def arrears(month):
+    rows = [row for row in _property_rows(month) if row['outstanding'] > 0]
+    rows.sort(key=lambda row: row['outstanding'], reverse=True)
+    return {
+        'month': month.strftime('%Y-%m'),
+        'properties': rows,
+        'total_outstanding': sum(row['outstanding'] for row in rows)
+    }
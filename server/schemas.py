@@ -0,0 +1,167 @@
+import math
+from datetime import date
+
+# Request body schemas. Each schema is compiled once, at import, into a flat
+# tuple of checks; loading a body runs them in one pass and reports every
+# problem at once, before the handler touches the database.
+
+_MISSING = object()
+
+
+class Field:
+    """`coerce(value)` returns the value to store, or raises ValueError/TypeError.
+
+    `error` may use {name}, which is filled in when the schema is compiled.
+    """
+
+    def __init__(self, coerce, error, required=True, default=_MISSING):
+        self.coerce = coerce
+        self.error = error
+        self.required = required and default is _MISSING
+        self.default = default
+
+def _bound(minimum, kind, maximum=None):
+    if maximum is not None:
+        return f'an {kind} from {minimum} to {maximum}'
+    if minimum == 0:
+        return f'a non-negative {kind}'
+    if minimum == 1 and kind == 'integer':
+        return 'a positive integer'
+    article = 'an' if kind == 'integer' else 'a'
+    return f'{article} {kind}' if minimum is None else f'{article} {kind} of at least {minimum}'
+
+def string(max_length, from_int=False, **options):
+    """With from_int, integers (not booleans) are accepted and stored as text."""
+    def coerce(value):
+        if from_int and type(value) is int:
+            value = str(value)
+        if not isinstance(value, str) or not value or len(value) > max_length:
+            raise ValueError
+        return value
+    return Field(coerce, f'{{name}} must be a non-empty string of at most {max_length} characters', **options)
+
+def integer(minimum=None, maximum=None, **options):
+    def coerce(value):
+        # bool is an int subclass; true is not a bedroom count
+        if type(value) is not int or (minimum is not None and value < minimum) or (
+                maximum is not None and value > maximum):
+            raise ValueError
+        return value
+    return Field(coerce, f'{{name}} must be {_bound(minimum, "integer", maximum)}', **options)
+
+def number(minimum=None, **options):
+    def coerce(value):
+        if type(value) not in (int, float) or not math.isfinite(value) or (
+                minimum is not None and value < minimum):
+            raise ValueError
+        return float(value)
+    return Field(coerce, f'{{name}} must be {_bound(minimum, "number")}', **options)
+
+def iso_date(**options):
+    def coerce(value):
+        # fromisoformat also takes week dates and compact forms; only YYYY-MM-DD is allowed
+        if not isinstance(value, str) or len(value) != 10 or value[4] != '-' or value[7] != '-':
+            raise ValueError
+        return date.fromisoformat(value)
+    return Field(coerce, 'Invalid date format. Use YYYY-MM-DD', **options)
+
+def month(**options):
+    def coerce(value):
+        if not isinstance(value, str) or len(value) != 7 or value[4] != '-':
+            raise ValueError
+        return date.fromisoformat(value + '-01')
+    return Field(coerce, 'Invalid month. Use YYYY-MM', **options)
+
+def array(**options):
+    def coerce(value):
+        if not isinstance(value, list):
+            raise ValueError
+        return value
+    return Field(coerce, '{name} must be an array', **options)
+
+class Schema:
+    def __init__(self, **fields):
+        self._fields = tuple(
+            (name, field.coerce, field.error.format(name=name), field.required, field.default)
+            for name, field in fields.items()
+        )
+
+    def load(self, data, partial=False):
+        """The coerced fields of `data`; unknown keys are dropped.
+
+        With partial=True (updates) only the fields present are checked and
+        nothing is required or defaulted.
+        """
+        if not isinstance(data, dict):
+            raise ValueError('Request body must be a JSON object')
+        result = {}
+        missing = []
+        errors = []
+        for name, coerce, error, required, default in self._fields:
+            value = data.get(name, _MISSING)
+            if value is _MISSING:
+                if partial:
+                    continue
+                if required:
+                    missing.append(name)
+                elif default is not _MISSING:
+                    result[name] = default
+                continue
+            try:
+                result[name] = coerce(value)
+            except (TypeError, ValueError):
+                errors.append(error)
+        if missing:
+            errors.insert(0, f'Missing required fields: {", ".join(missing)}')
+        if errors:
+            raise ValueError('; '.join(errors))
+        return result
+
+    def load_many(self, records, errors):
+        """Load a chunk of (index, record) pairs; failures go to `errors`."""
+        valid = []
+        for index, record in records:
+            if isinstance(record, ValueError):
+                errors.append({'index': index, 'message': str(record)})
+            elif not isinstance(record, dict):
+                errors.append({'index': index, 'message': 'Row must be a JSON object'})
+            else:
+                try:
+                    valid.append((index, self.load(record)))
+                except ValueError as e:
+                    errors.append({'index': index, 'message': str(e)})
+        return valid
+
+PROPERTY_SCHEMA = Schema(
+    name=string(100),
+    address=string(200),
+    bedrooms=integer(minimum=0),
+    rent=number(minimum=0)
+)
+
+TENANT_SCHEMA = Schema(
+    name=string(100),
+    phone=string(20),
+    email=string(100),
+    # Unit numbers were integers before unit_id became a string column
+    unit_id=string(50, from_int=True),
+    property_id=integer(minimum=1)
+)
+
+PAYMENT_SCHEMA = Schema(
+    payment_type=string(50),
+    amount=number(minimum=0),
+    payment_date=iso_date(),
+    tenant_id=integer(minimum=1),
+    status=string(50, default='pending')
+)
+
+INVOICE_SCHEMA = Schema(
+    month=month(),
+    # Each worker holds a pooled connection for its chunk
+    workers=integer(minimum=1, maximum=16, default=4)
+)
+
+BATCH_SCHEMA = Schema(
+    requests=array()
+)
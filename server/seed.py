@@ -1,35 +1,191 @@
-from datetime import datetime
-from app import app, db
-from models import Property, Tenant, Payment
+import csv
+import io
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from models import (db, Property, Tenant, Payment, PaymentArchive, MonthlyPropertySummary,
+                    TenantBalance)
+from aggregates import rebuild_balances, rebuild_summaries
 
-# Initialize the app and database
-with app.app_context():
-    # Clear existing data
-    # db.drop_all()
-    # db.create_all()
+FIRST_NAMES = [
+    'John', 'Jane', 'Amina', 'Brian', 'Grace', 'Kevin', 'Wanjiru', 'Peter', 'Mary', 'David',
+    'Faith', 'Samuel', 'Lucy', 'James', 'Esther', 'Daniel', 'Ruth', 'Joseph', 'Ann', 'Michael'
+]
+LAST_NAMES = [
+    'Doe', 'Smith', 'Otieno', 'Mwangi', 'Kamau', 'Njoroge', 'Achieng', 'Wafula', 'Kariuki',
+    'Brown', 'Johnson', 'Ochieng', 'Muthoni', 'Kiptoo', 'Chebet', 'Nyambura', 'Garcia', 'Lee'
+]
+STREETS = ['Sunset Blvd', 'Ocean Dr', 'Ngong Rd', 'Moi Ave', 'Kenyatta Ave', 'Waiyaki Way', 'Park Ln']
+BUILDINGS = ['Villa', 'Apartments', 'Court', 'Heights', 'Gardens', 'Residences', 'Towers']
 
-    # Seed properties
-    property1 = Property(name="Sunset Villa", address="123 Sunset Blvd, LA", bedrooms=3, rent=2500)
-    property2 = Property(name="Oceanview Apartments", address="456 Ocean Dr, LA", bedrooms=2, rent=1800)
+PROPERTY_COLUMNS = ('id', 'name', 'address', 'bedrooms', 'rent', 'created_at', 'updated_at')
+TENANT_COLUMNS = ('id', 'name', 'phone', 'email', 'unit_id', 'property_id', 'created_at', 'updated_at')
+PAYMENT_COLUMNS = ('payment_type', 'status', 'amount', 'payment_date', 'received_at', 'tenant_id')
 
-    db.session.add(property1)
-    db.session.add(property2)
-    db.session.commit()
+# Properties generated per worker task
+PROPERTIES_PER_TASK = 50
 
-    # Seed tenants
-    tenant1 = Tenant(name="John Doe", phone="1234567890", unit_id=101, email="john@example.com", property_id=property1.id)
-    tenant2 = Tenant(name="Jane Smith", phone="9876543210", unit_id=102, email="jane@example.com", property_id=property2.id)
 
-    db.session.add(tenant1)
-    db.session.add(tenant2)
-    db.session.commit()
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
 
-    # Seed payments
-    payment1 = Payment(payment_type="Rent", status="Paid", amount=2500, payment_date=datetime(2025, 1, 1), tenant_id=tenant1.id)
-    payment2 = Payment(payment_type="Rent", status="Pending", amount=1800, payment_date=datetime(2025, 1, 1), tenant_id=tenant2.id)
+def _timestamp(value):
+    # The text format SQLAlchemy reads back from SQLite; Postgres accepts it too
+    return value.isoformat(' ')
 
-    db.session.add(payment1)
-    db.session.add(payment2)
-    db.session.commit()
+def generate_properties(task):
+    """Rows for one block of properties, their tenants and their payments.
 
-    print("Database seeded successfully.")
+    Each property draws from its own RNG seeded with (seed, property id),
+    so the output does not depend on how the work is split across workers.
+    """
+    seed, first_property_id, count, tenants_per_property, months, start_month, first_tenant_id = task
+    properties, tenants, payments = [], [], []
+    for offset in range(count):
+        property_id = first_property_id + offset
+        rng = random.Random(f'{seed}:{property_id}')
+        created = datetime.combine(add_months(start_month, -1), datetime.min.time())
+        bedrooms = rng.randint(1, 5)
+        rent = round(rng.uniform(600, 900) * bedrooms, -1)
+        properties.append((
+            property_id,
+            f'{rng.choice(LAST_NAMES)} {rng.choice(BUILDINGS)} {property_id}',
+            f'{rng.randint(1, 999)} {rng.choice(STREETS)}',
+            bedrooms, rent, _timestamp(created), _timestamp(created)
+        ))
+        for unit in range(tenants_per_property):
+            tenant_id = first_tenant_id + offset * tenants_per_property + unit
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            tenants.append((
+                tenant_id,
+                f'{first} {last}',
+                f'07{rng.randint(10000000, 99999999)}',
+                f'{first.lower()}.{last.lower()}.{tenant_id}@example.com',
+                f'{unit // 10 + 1}{unit % 10 + 1:02d}',
+                property_id, _timestamp(created), _timestamp(created)
+            ))
+            # Tenants move in at different times; the latest month is the
+            # most likely to still be pending
+            move_in = rng.randint(0, months // 3) if months > 2 else 0
+            for month_index in range(move_in, months):
+                month = add_months(start_month, month_index)
+                due = month + timedelta(days=rng.randint(0, 6))
+                latest = month_index == months - 1
+                status = 'pending' if rng.random() < (0.35 if latest else 0.04) else 'paid'
+                received = datetime.combine(due, datetime.min.time()) + timedelta(
+                    hours=rng.randint(8, 20), minutes=rng.randint(0, 59))
+                payments.append(('Rent', status, rent, due.isoformat(), _timestamp(received), tenant_id))
+                if rng.random() < 0.05:
+                    payments.append((
+                        'Utilities', 'paid', round(rng.uniform(20, 120), 2),
+                        due.isoformat(), _timestamp(received), tenant_id
+                    ))
+    return properties, tenants, payments
+
+def _copy_rows(connection, table, columns, rows):
+    # COPY is the fastest way into Postgres; psycopg2 exposes it as copy_expert
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH CSV', buffer)
+
+def _insert_rows(connection, table, columns, rows):
+    if not rows:
+        return
+    dialect = connection.dialect
+    if dialect.name == 'postgresql' and dialect.driver == 'psycopg2':
+        _copy_rows(connection, table, columns, rows)
+        return
+    marker = '?' if dialect.paramstyle == 'qmark' else '%s'
+    sql = f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join([marker] * len(columns))})'
+    connection.exec_driver_sql(sql, rows)
+
+def _reset_sequences(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    for table in ('properties', 'tenants', 'payments'):
+        connection.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        )
+
+def seed(properties=100, tenants_per_property=10, months=12, seed_value=1,
+         workers=None, start_month=None, reset=False, progress=None):
+    start_month = start_month or add_months(date.today().replace(day=1), -(months - 1))
+    if reset:
+        MonthlyPropertySummary.query.delete()
+        TenantBalance.query.delete()
+        PaymentArchive.query.delete()
+        Payment.query.delete()
+        Tenant.query.delete()
+        Property.query.delete()
+        db.session.commit()
+
+    archived = {'include_archived': True}
+    first_property_id = (db.session.scalar(select(func.max(Property.id)), execution_options=archived) or 0) + 1
+    first_tenant_id = (db.session.scalar(select(func.max(Tenant.id)), execution_options=archived) or 0) + 1
+    tasks = []
+    for offset in range(0, properties, PROPERTIES_PER_TASK):
+        count = min(PROPERTIES_PER_TASK, properties - offset)
+        tasks.append((
+            seed_value, first_property_id + offset, count, tenants_per_property, months,
+            start_month, first_tenant_id + offset * tenants_per_property
+        ))
+
+    totals = {'properties': 0, 'tenants': 0, 'payments': 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        with db.engine.begin() as connection:
+            for property_rows, tenant_rows, payment_rows in pool.map(generate_properties, tasks):
+                _insert_rows(connection, 'properties', PROPERTY_COLUMNS, property_rows)
+                _insert_rows(connection, 'tenants', TENANT_COLUMNS, tenant_rows)
+                _insert_rows(connection, 'payments', PAYMENT_COLUMNS, payment_rows)
+                totals['properties'] += len(property_rows)
+                totals['tenants'] += len(tenant_rows)
+                totals['payments'] += len(payment_rows)
+                if progress:
+                    progress(totals)
+            _reset_sequences(connection)
+
+    rebuild_summaries()
+    rebuild_balances()
+    return totals
+
+@click.command('seed')
+@click.option('--properties', default=100, show_default=True, help='Properties to create.')
+@click.option('--tenants-per-property', default=10, show_default=True)
+@click.option('--months', default=12, show_default=True, help='Months of payment history.')
+@click.option('--start-month', default=None, help='First month of history (YYYY-MM). '
+              'Defaults to --months before the current month.')
+@click.option('--seed', 'seed_value', default=1, show_default=True, help='Random seed.')
+@click.option('--workers', default=None, type=int, help='Generator processes (default: CPU count).')
+@click.option('--reset', is_flag=True, help='Delete existing properties, tenants and payments first.')
+@with_appcontext
+def seed_command(properties, tenants_per_property, months, start_month, seed_value, workers, reset):
+    """Load a deterministic synthetic dataset."""
+    if start_month:
+        start_month = datetime.strptime(start_month, '%Y-%m').date()
+    started = time.perf_counter()
+
+    def progress(totals):
+        click.echo(
+            f'\r{totals["properties"]} properties, {totals["tenants"]} tenants, '
+            f'{totals["payments"]} payments', nl=False
+        )
+
+    totals = seed(properties, tenants_per_property, months, seed_value,
+                  workers, start_month, reset, progress)
+    click.echo(f'\nDatabase seeded in {time.perf_counter() - started:.1f}s '
+               f'({totals["payments"]} payments).')
+
+if __name__ == '__main__':
+    from app import create_app
+
+    with create_app().app_context():
+        totals = seed(properties=2, tenants_per_property=1, months=1)
+        print(f'Database seeded successfully ({totals["payments"]} payments).')
@@ -0,0 +1,125 @@
+from functools import lru_cache
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime
+from sqlalchemy.orm import load_only, undefer, undefer_group
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# List response bodies: one object per row, or ?format=columnar with the
+# keys sent once as 'columns' and each row as a list of values
+LIST_FORMATS = ('json', 'columnar')
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+class Serializer:
+    """Turns model instances into dicts with a function generated once per
+    model (and once per sparse fieldset) instead of reflecting over
+    __table__.columns for every row.
+    """
+
+    def __init__(self, model, extra=(), optional=(), exclude=()):
+        self.model = model
+        self.columns = [column.key for column in model.__table__.columns if column.key not in exclude]
+        self.dates = {
+            column.key for column in model.__table__.columns
+            if isinstance(column.type, (Date, DateTime))
+        }
+        self.extra = list(extra)
+        # Optional fields are left out of the output when they are None
+        self.optional = set(optional)
+        self.fields = self.columns + self.extra
+        self._full = self.compile(tuple(self.fields))
+
+    def __call__(self, obj, fields=None):
+        if fields is None:
+            return self._full(obj)
+        return self.compile(tuple(fields))(obj)
+
+    def parse_fields(self, value):
+        # ?fields=id,name -> ordered tuple of known fields, id always first
+        if not value:
+            return None
+        requested = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in requested if name not in self.fields]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        return tuple(name for name in self.fields if name == 'id' or name in requested)
+
+    @lru_cache(maxsize=64)
+    def compile(self, fields):
+        lines = ['def serialize(obj):', '    data = {']
+        for name in fields:
+            if name in self.optional:
+                continue
+            value = f'obj.{name}'
+            if name in self.dates:
+                value = f'_isoformat({value})'
+            lines.append(f'        {name!r}: {value},')
+        lines.append('    }')
+        for name in fields:
+            if name in self.optional:
+                lines.append(f'    if obj.{name} is not None:')
+                lines.append(f'        data[{name!r}] = obj.{name}')
+        lines.append('    return data')
+        namespace = {'_isoformat': _isoformat}
+        exec(compile('\n'.join(lines), f'<serializer {self.model.__name__}>', 'exec'), namespace)
+        return namespace['serialize']
+
+    def columns_for(self, fields=None):
+        return list(self.fields if fields is None else fields)
+
+    def rows(self, objs, fields=None):
+        # Columnar form: one list of values per row, in columns_for() order
+        to_row = self.compile_row(tuple(self.columns_for(fields)))
+        return [to_row(obj) for obj in objs]
+
+    @lru_cache(maxsize=64)
+    def compile_row(self, fields):
+        # Optional fields are kept as null so every row has every column
+        values = []
+        for name in fields:
+            value = f'obj.{name}'
+            if name in self.dates:
+                value = f'_isoformat({value})'
+            values.append(value)
+        source = f'def serialize_row(obj):\n    return [{", ".join(values)}]'
+        namespace = {'_isoformat': _isoformat}
+        exec(compile(source, f'<row serializer {self.model.__name__}>', 'exec'), namespace)
+        return namespace['serialize_row']
+
+    def load_options(self, fields, always=()):
+        # Column loading options for a sparse fieldset; None means load all
+        if fields is None:
+            return [undefer_group('summary')]
+        columns = [getattr(self.model, name) for name in fields if name in self.columns]
+        extras = [undefer(getattr(self.model, name)) for name in fields if name in self.extra]
+        return [load_only(*columns, *always)] + extras
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used when it is installed."""
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default),
+            mimetype=self.mimetype
+        )
+
+def install_json_provider(app):
+    if orjson is not None:
+        app.json = FastJSONProvider(app)
+    else:
+        app.json.sort_keys = False
@@ -0,0 +1,46 @@
+from datetime import datetime
+from sqlalchemy import event, update
+from sqlalchemy.orm import with_loader_criteria
+from database import RoutingSession
+from models import db, Property, Tenant
+from changes import record_changes
+
+DELETE_MODES = ('hard', 'archive')
+
+# Models whose DELETE can archive instead
+ARCHIVABLE = (Property, Tenant)
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _hide_archived(state):
+    # Archived rows drop out of every ORM SELECT, including the name and
+    # count subqueries and eager loads it carries, unless the statement opts
+    # in with execution_options(include_archived=True). Attribute refreshes
+    # and lazy loads are left alone, so a payment can still reach its
+    # archived tenant to keep the summaries right.
+    if (not state.is_select or state.is_column_load or state.is_relationship_load
+            or state.execution_options.get('include_archived', False)):
+        return
+    state.statement = state.statement.options(*(
+        with_loader_criteria(model, model.archived_at.is_(None), include_aliases=True,
+                             propagate_to_loaders=False)
+        for model in ARCHIVABLE
+    ))
+
+def archive_tenant(tenant):
+    # Payments stay, and so do their summaries: archiving hides the tenant,
+    # not the money it paid
+    tenant.archived_at = datetime.utcnow()
+
+def archive_property(property):
+    now = datetime.utcnow()
+    property.archived_at = now
+    # One set-based statement however many tenants the property has
+    tenant_ids = db.session.scalars(
+        update(Tenant)
+        .where(Tenant.property_id == property.id, Tenant.archived_at.is_(None))
+        .values(archived_at=now)
+        .returning(Tenant.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    record_changes(Tenant, tenant_ids)
@@ -0,0 +1,62 @@
+"""Statements per request must not grow with the page size."""
+import pytest
+from sqlalchemy import event
+from app import create_app
+from models import db
+from seed import seed
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    path = tmp_path_factory.mktemp('db') / 'query_counts.db'
+    app = create_app({
+        'DATABASE_URL': f'sqlite:///{path}',
+        'RESPONSE_CACHE_ENABLED': False,
+        'ADMISSION_ENABLED': False
+    })
+    with app.app_context():
+        db.create_all()
+        seed(properties=12, tenants_per_property=5, months=2)
+    return app.test_client()
+
+@pytest.fixture
+def statements(client):
+    """The statements run while a test makes requests."""
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', count)
+
+def get(client, statements, path):
+    statements.clear()
+    response = client.get(path)
+    assert response.status_code == 200
+    return response.get_json()['data'], len(statements)
+
+@pytest.mark.parametrize('resource, field', [
+    ('properties', 'tenant_count'),
+    ('tenants', 'property_name'),
+    ('payments', 'tenant_name'),
+])
+def test_list_page_runs_two_statements(client, statements, resource, field):
+    for per_page in (2, 10):
+        data, count = get(client, statements, f'/api/{resource}?per_page={per_page}')
+        assert len(data) == per_page
+        assert all(field in row for row in data)
+        # The page and the total
+        assert count == 2
+
+@pytest.mark.parametrize('resource, field', [
+    ('properties', 'tenant_count'),
+    ('tenants', 'payment_count'),
+    ('payments', 'tenant_name'),
+])
+def test_detail_read_runs_one_statement(client, statements, resource, field):
+    data, count = get(client, statements, f'/api/{resource}/1')
+    assert field in data
+    assert count == 1